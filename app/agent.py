@@ -1,15 +1,24 @@
 """LLM agent for generating insights using Groq."""
 import json
+from functools import lru_cache
 from typing import List
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from app.config import GROQ_API_KEY, GROQ_MODEL
+from app.config import GROQ_API_KEY, GROQ_MODEL, CHART_SPEC_MODE
 from app.schemas import DatasetProfile, Insight
-from app.prompts import SYSTEM_PROMPT, INSIGHT_GENERATION_PROMPT, SUMMARY_GENERATION_PROMPT
+from app.llm_scheduler import INTERACTIVE, llm_scheduler
+from app.prompts import SYSTEM_PROMPT, INSIGHT_GENERATION_PROMPT, SUMMARY_GENERATION_PROMPT, CHART_SPEC_PROMPT
 
 
+@lru_cache(maxsize=1)
 def create_groq_llm():
-    """Create and return a Groq LLM instance."""
+    """
+    Return the shared Groq LLM instance.
+    
+    Created once per process so every request reuses its HTTP connection pool.
+    """
+    if not GROQ_API_KEY:
+        raise RuntimeError("GROQ_API_KEY environment variable is required")
     return ChatGroq(
         groq_api_key=GROQ_API_KEY,
         model_name=GROQ_MODEL,
@@ -17,12 +26,29 @@ def create_groq_llm():
     )
 
 
-def generate_insights(profile: DatasetProfile) -> List[Insight]:
+def _invoke(call: str, llm, prompt: ChatPromptTemplate, variables: dict, priority: str, client: str):
+    """Send a formatted prompt through the shared LLM scheduler."""
+    messages = prompt.format_messages(**variables)
+    prompt_text = "\n".join(f"{m.type}: {m.content}" for m in messages)
+    return llm_scheduler.submit(call, lambda: llm.invoke(messages), prompt_text, priority=priority, client=client)
+
+
+def _profile_json(profile: DatasetProfile) -> str:
+    """Profile as prompt JSON, with the sampling caveat spelled out for sampled profiles."""
+    profile_dict = profile.model_dump()
+    if profile.sampling_note:
+        profile_dict["sampling_note"] = profile.sampling_note
+    return json.dumps(profile_dict, indent=2)
+
+
+def generate_insights(profile: DatasetProfile, priority: str = INTERACTIVE, client: str = "anonymous") -> List[Insight]:
     """
     Generate insights from a dataset profile using Groq LLM.
     
     Args:
         profile: DatasetProfile object
+        priority: Scheduling class, INTERACTIVE or BATCH
+        client: Caller identity used for fair queuing
         
     Returns:
         List of Insight objects
@@ -30,12 +56,14 @@ def generate_insights(profile: DatasetProfile) -> List[Insight]:
     llm = create_groq_llm()
     
     # Convert profile to JSON
-    profile_dict = profile.model_dump()
-    profile_json = json.dumps(profile_dict, indent=2)
+    profile_json = _profile_json(profile)
     
     # Create prompt template
     system_template = SystemMessagePromptTemplate.from_template(SYSTEM_PROMPT)
-    human_template = HumanMessagePromptTemplate.from_template(INSIGHT_GENERATION_PROMPT)
+    insight_prompt = INSIGHT_GENERATION_PROMPT
+    if CHART_SPEC_MODE:
+        insight_prompt += CHART_SPEC_PROMPT
+    human_template = HumanMessagePromptTemplate.from_template(insight_prompt)
     
     prompt = ChatPromptTemplate.from_messages([
         system_template,
@@ -43,8 +71,7 @@ def generate_insights(profile: DatasetProfile) -> List[Insight]:
     ])
     
     # Generate insights
-    chain = prompt | llm
-    response = chain.invoke({"profile_json": profile_json})
+    response = _invoke("insights", llm, prompt, {"profile_json": profile_json}, priority, client)
     
     # Parse response
     content = response.content.strip()
@@ -71,7 +98,13 @@ def generate_insights(profile: DatasetProfile) -> List[Insight]:
     insights = []
     for insight_data in insights_data:
         try:
-            insight = Insight(**insight_data)
+            try:
+                insight = Insight(**insight_data)
+            except Exception:
+                # A malformed chart_spec shouldn't cost us the insight; chart_code still renders it
+                if not isinstance(insight_data, dict) or 'chart_spec' not in insight_data:
+                    raise
+                insight = Insight(**{k: v for k, v in insight_data.items() if k != 'chart_spec'})
             insights.append(insight)
         except Exception as e:
             print(f"Warning: Failed to create insight from {insight_data}: {e}")
@@ -92,13 +125,20 @@ def generate_insights(profile: DatasetProfile) -> List[Insight]:
     return insights[:3]  # Return exactly 3
 
 
-def generate_summary(profile: DatasetProfile, insights: List[Insight]) -> str:
+def generate_summary(
+    profile: DatasetProfile,
+    insights: List[Insight],
+    priority: str = INTERACTIVE,
+    client: str = "anonymous"
+) -> str:
     """
     Generate an executive summary from profile and insights.
     
     Args:
         profile: DatasetProfile object
         insights: List of Insight objects
+        priority: Scheduling class, INTERACTIVE or BATCH
+        client: Caller identity used for fair queuing
         
     Returns:
         Executive summary string (100-150 words)
@@ -106,8 +146,7 @@ def generate_summary(profile: DatasetProfile, insights: List[Insight]) -> str:
     llm = create_groq_llm()
     
     # Convert to JSON
-    profile_dict = profile.model_dump()
-    profile_json = json.dumps(profile_dict, indent=2)
+    profile_json = _profile_json(profile)
     
     # Create insights summary
     insights_summary = "\n".join([
@@ -125,11 +164,30 @@ def generate_summary(profile: DatasetProfile, insights: List[Insight]) -> str:
     ])
     
     # Generate summary
-    chain = prompt | llm
-    response = chain.invoke({
+    response = _invoke("summary", llm, prompt, {
         "profile_json": profile_json,
         "insights_summary": insights_summary
-    })
+    }, priority, client)
     
     return response.content.strip()
 
+
+def brief_summary(profile: DatasetProfile, insights: List[Insight]) -> str:
+    """
+    Summary assembled from the profile and insight titles without an LLM call.
+    
+    Used by the reduced quality tiers; see app.quality.
+    
+    Args:
+        profile: DatasetProfile object
+        insights: List of Insight objects (may be empty)
+        
+    Returns:
+        Short summary string
+    """
+    summary = f"The dataset has {profile.n_rows:,} rows and {profile.n_cols} columns."
+    if insights:
+        summary += " Key findings: " + "; ".join(insight.title for insight in insights) + "."
+    else:
+        summary += " Insights and charts were skipped because the service is under heavy load; retry later for a full analysis."
+    return summary
@@ -0,0 +1,229 @@
+"""Aggregate index built while profiling, so common chart queries don't rescan the data."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.config import CHART_MAX_POINTS, DATASET_CACHE_SIZE
+from app.metrics import record_cache
+from app.schemas import DatasetProfile
+
+# Histograms are stored at this resolution; any bin count dividing it is answered exactly
+INDEX_HISTOGRAM_BINS = 600
+# Most frequent values kept per column
+INDEX_TOP_K = 50
+# Columns with at most this many distinct values get a groupby cube
+INDEX_MAX_GROUPS = 50
+# Aggregations precomputed per group and numeric column (median isn't: it
+# needs a sort per group, and median bar charts fall back to the raw data)
+CUBE_AGGREGATIONS = ["count", "sum", "mean", "min", "max"]
+
+
+class AggregateIndex:
+    """
+    Small summaries of a dataset that answer the usual chart queries.
+
+    Holds fine-grained histograms of numeric columns, top-k value counts of
+    every column, groupby cubes (count/sum/mean/min/max of every numeric
+    column) for low-cardinality columns and a uniform row sample of
+    the numeric columns for scatter plots. Each lookup returns None when the
+    index can't answer exactly, and callers fall back to the raw data.
+
+    An index built from a row sample (see build's scale) answers with
+    estimates scaled to the full dataset instead.
+    """
+
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+        self.histograms: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.value_counts: Dict[str, pd.Series] = {}
+        self.distinct: Dict[str, int] = {}
+        self.cubes: Dict[str, pd.DataFrame] = {}
+        self.sample: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, scale: float = 1.0) -> "AggregateIndex":
+        """
+        Build the index in one pass over the dataset.
+
+        Each column is factorized once; the codes give its value counts and
+        distinct count and, for low-cardinality columns, the groups of the
+        cube, which are reduced with np.*.reduceat over rows sorted by group.
+
+        Args:
+            df: The dataset, or a uniform row sample of it
+            scale: Rows in the dataset per row of df; counts and sums are
+                multiplied by it so a sample answers for the whole dataset
+
+        Returns:
+            AggregateIndex for df
+        """
+        index = cls(int(round(len(df) * scale)))
+        numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        # One row per numeric column, so per-column reductions run over contiguous memory
+        measures = np.ascontiguousarray(df[numeric].to_numpy(dtype=float).T) if numeric else np.empty((0, len(df)))
+
+        for col, values in zip(numeric, measures):
+            values = values[np.isfinite(values)]
+            if values.size:
+                counts, edges = np.histogram(values, bins=INDEX_HISTOGRAM_BINS)
+                index.histograms[col] = (_scaled(counts, scale), edges)
+
+        for col in df.columns:
+            codes, uniques = pd.factorize(df[col])
+            valid = codes >= 0
+            counts = np.bincount(codes[valid], minlength=len(uniques))
+            # Same order as Series.value_counts: by count, ties in order of appearance
+            top = np.argsort(-counts, kind='stable')[:INDEX_TOP_K]
+            index.value_counts[col] = pd.Series(_scaled(counts[top], scale), index=uniques[top], name="count")
+            index.distinct[col] = len(uniques)
+            if 1 < len(uniques) <= INDEX_MAX_GROUPS:
+                others = [j for j, name in enumerate(numeric) if name != col]
+                if others:
+                    cube = _group_cube(codes, uniques, measures, others, scale)
+                    if cube is not None:
+                        cube.columns = pd.MultiIndex.from_product([[numeric[j] for j in others], CUBE_AGGREGATIONS])
+                        index.cubes[col] = cube
+
+        if numeric:
+            sample = df[numeric]
+            if len(sample) > CHART_MAX_POINTS:
+                sample = sample.sample(n=CHART_MAX_POINTS, random_state=0).sort_index()
+            index.sample = sample
+        return index
+
+    def histogram(self, column: str, bins: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Counts and edges of column over its full range, as np.histogram(values, bins) returns."""
+        if column not in self.histograms or INDEX_HISTOGRAM_BINS % bins:
+            return None
+        counts, edges = self.histograms[column]
+        return counts.reshape(bins, -1).sum(axis=1), edges[::INDEX_HISTOGRAM_BINS // bins]
+
+    def top_values(self, column: str, limit: Optional[int] = None) -> Optional[pd.Series]:
+        """The limit most frequent values of column (all values when limit is None)."""
+        if column not in self.value_counts:
+            return None
+        complete = self.distinct[column] <= INDEX_TOP_K
+        if limit is None:
+            return self.value_counts[column] if complete else None
+        return self.value_counts[column].head(limit) if complete or limit <= INDEX_TOP_K else None
+
+    def group_aggregate(self, by: str, column: str, aggregation: str) -> Optional[pd.Series]:
+        """df.groupby(by)[column].agg(aggregation), in group order."""
+        cube = self.cubes.get(by)
+        if cube is None or (column, aggregation) not in cube.columns:
+            return None
+        return cube[(column, aggregation)]
+
+    def scatter_points(self, x: str, y: str) -> Optional[pd.DataFrame]:
+        """A uniform sample of at most CHART_MAX_POINTS non-null (x, y) rows."""
+        if self.sample is None or x not in self.sample.columns or y not in self.sample.columns:
+            return None
+        return self.sample[[x, y]].dropna()
+
+
+def _scaled(counts: np.ndarray, scale: float) -> np.ndarray:
+    """Counts from a sample estimated for the full dataset."""
+    return counts if scale == 1.0 else np.rint(counts * scale).astype(counts.dtype)
+
+
+def _group_cube(
+    codes: np.ndarray,
+    uniques,
+    measures: np.ndarray,
+    rows: List[int],
+    scale: float = 1.0
+) -> Optional[pd.DataFrame]:
+    """
+    Per-group CUBE_AGGREGATIONS of the selected measures, like df.groupby(key).agg(...).
+
+    Args:
+        codes: Group code of each row (-1 where the key is missing)
+        uniques: Group labels, indexed by code
+        measures: Float matrix with one row per numeric column
+        rows: Rows of measures to aggregate
+        scale: Multiplier for count and sum when the rows are a sample
+
+    Returns:
+        DataFrame indexed by sorted group label with columns ordered by
+        measure, then aggregation, or None if the labels can't be sorted
+    """
+    try:
+        label_order = np.argsort(uniques)
+    except TypeError:
+        return None
+    # Small integer codes let the stable argsort below use radix sort
+    rank = np.empty(len(uniques) + 1, dtype=np.int16)
+    rank[label_order] = np.arange(len(uniques))
+    rank[-1] = len(uniques)  # Missing keys (code -1) sort last and are dropped
+    groups = rank[codes]
+    order = np.argsort(groups, kind='stable')
+    order = order[:np.count_nonzero(codes >= 0)]
+    block = np.take(measures[rows], order, axis=1)
+    starts = np.searchsorted(groups[order], np.arange(len(uniques)))
+
+    present = ~np.isnan(block)
+    count = np.add.reduceat(present.astype(np.int64), starts, axis=1)
+    total = np.add.reduceat(np.where(present, block, 0.0), starts, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    # fmin/fmax skip NaN; all-NaN groups give NaN, as in pandas
+    minimum = np.fmin.reduceat(block, starts, axis=1)
+    maximum = np.fmax.reduceat(block, starts, axis=1)
+
+    by_aggregation = dict(count=_scaled(count, scale), sum=total * scale, mean=mean, min=minimum, max=maximum)
+    # (measure, aggregation, group) -> (group, measure × aggregation)
+    cube = np.stack([by_aggregation[name] for name in CUBE_AGGREGATIONS], axis=1)
+    return pd.DataFrame(cube.reshape(-1, len(uniques)).T, index=uniques[label_order])
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content, the key for cached profiles."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetEntry(NamedTuple):
+    """A cached profile and aggregate index; sampled when both were computed from a row sample."""
+    profile: DatasetProfile
+    index: AggregateIndex
+    sampled: bool = False
+
+
+class DatasetCache:
+    """Bounded LRU of profiles and aggregate indexes keyed by file content digest."""
+
+    def __init__(self, max_datasets: int = DATASET_CACHE_SIZE):
+        self.max_datasets = max_datasets
+        self._datasets: "OrderedDict[str, DatasetEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, digest: str, profile: DatasetProfile, index: AggregateIndex, sampled: bool = False):
+        with self._lock:
+            current = self._datasets.get(digest)
+            # Never replace an exact entry with a sampled one
+            if current is None or current.sampled or not sampled:
+                self._datasets[digest] = DatasetEntry(profile, index, sampled)
+            self._datasets.move_to_end(digest)
+            while len(self._datasets) > self.max_datasets:
+                self._datasets.popitem(last=False)
+
+    def get(self, digest: str) -> Optional[DatasetEntry]:
+        with self._lock:
+            entry = self._datasets.get(digest)
+            if entry is not None:
+                self._datasets.move_to_end(digest)
+        record_cache("dataset", entry is not None)
+        return entry
+
+    def index_for(self, path: str) -> Optional[AggregateIndex]:
+        """The aggregate index of the file at path, if it was profiled recently."""
+        entry = self.get(file_digest(path))
+        return entry.index if entry is not None else None
+
+
+dataset_cache = DatasetCache()
@@ -1,24 +1,53 @@
 """FastAPI application and endpoints."""
+import functools
 import os
+import shutil
 import tempfile
-import base64
+import time
 import logging
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+import anyio
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from app.config import MAX_FILE_SIZE_MB, CHARTS_DIR
-from app.profiler import profile_dataset
-from app.agent import generate_insights, generate_summary
-from app.charts import generate_chart
-from app.formatter import generate_reports
+from fastapi.responses import JSONResponse, Response
+from app.config import (
+    MAX_FILE_SIZE_MB, PROFILING_ADMIN_TOKEN, WARMUP_ON_STARTUP, BATCH_MAX_FILES, PROFILE_SAMPLE_ROWS,
+    ANALYSIS_WORKERS, TRUSTED_PROXIES, BATCH_MAX_TOTAL_MB
+)
+from app.formatter import ReportRenderer, encode_chart_asset, REPORT_CSS
+from app.store import report_store
+from app.responses import json_response, negotiated_response
+from app.profiling import ProfileSession, profile_request, profile_store, is_admin
+from app.metrics import IN_FLIGHT, REQUEST_SECONDS, stage, start_request_timings, server_timing_header
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.schemas import Report, Insight
+from app.warmup import start_warm_up, warm_up_state
+from app.batch import BatchFile, batch_scheduler, combined_overview, extract_zip, validate_csv
+from app.llm_scheduler import INTERACTIVE, LLMQueueTimeout
+from app.quality import QualityTier, quality_policy
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HTML reports carry LLM- and upload-derived text; even if something slips
+# past escaping, no script runs and nothing loads from another origin
+REPORT_CSP = "default-src 'none'; img-src 'self' data:; style-src 'self' 'unsafe-inline'"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background; /health/ready reports 503 until it finishes."""
+    if WARMUP_ON_STARTUP:
+        start_warm_up()
+    else:
+        warm_up_state.done.set()
+    yield
+    batch_scheduler.shutdown()
+
 
-app = FastAPI(title="CSV Insight Copilot API", version="1.0.0")
+app = FastAPI(title="CSV Insight Copilot API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -30,22 +59,180 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request and report its pipeline stages in a Server-Timing header."""
+    timings = start_request_timings()
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        IN_FLIGHT.dec()
+        # Label by route template so report ids don't create a series per request
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=str(status),
+        ).observe(elapsed)
+    timings.append(("total", elapsed * 1000))
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness: the process is up and serving HTTP."""
     return {"status": "healthy"}
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: warm-up has finished and the Groq API key is configured."""
+    status_code = 200 if warm_up_state.ready else 503
+    return JSONResponse(
+        status_code=status_code,
+        content={"status": "ready" if status_code == 200 else "not ready", **warm_up_state.status()},
+    )
+
+
 @app.post("/analyze")
-async def analyze_csv(file: UploadFile = File(...)):
+async def analyze_csv(request: Request, file: UploadFile = File(...), include_reports: bool = Query(False)):
     """
     Analyze a CSV file and generate insights, charts, and reports.
     
+    Charts and reports are served on demand from the /reports endpoints; the
+    response only carries their URLs unless include_reports is set. Profiled
+    requests get an X-Profile-Id header naming their /profiles resources.
+    
+    Under load the analysis runs at a reduced quality tier (sampled profile,
+    lower-resolution charts, no summary call, HTML only by link, profile
+    only); the tier is reported in quality_tier and the X-Quality-Tier header.
+    
     Args:
+        request: Incoming request (for content-encoding negotiation)
         file: Uploaded CSV file
+        include_reports: Whether to inline base64 charts and both reports
         
     Returns:
-        Report JSON with insights, charts, and reports
+        Report JSON with insights and chart/report links
+    """
+    with profile_request(request) as session:
+        response = await _run_analysis(request, file, include_reports, session)
+    if session is not None and session.finished:
+        response.headers['X-Profile-Id'] = session.id
+    return response
+
+
+def _client_id(request: Request) -> str:
+    """
+    Identity used for fair LLM queuing: the peer address.
+    
+    The X-Client-Id header is only honoured from TRUSTED_PROXIES; otherwise
+    a caller could claim extra fair-share turns by rotating ids.
+    """
+    host = request.client.host if request.client else None
+    if host in TRUSTED_PROXIES and request.headers.get("x-client-id"):
+        return request.headers["x-client-id"]
+    return host or "anonymous"
+
+
+# Created on first use, as anyio limiters need a running event loop
+_analysis_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+async def _run_pipeline(func, *args):
+    """
+    Run a blocking analysis pipeline on a worker thread.
+    
+    Pipelines hold their thread while they wait for the LLM scheduler, so
+    they get their own ANALYSIS_WORKERS threads rather than the shared
+    threadpool; once those are busy, further analyses wait without a thread.
+    """
+    global _analysis_limiter
+    if _analysis_limiter is None:
+        _analysis_limiter = anyio.CapacityLimiter(ANALYSIS_WORKERS)
+    return await anyio.to_thread.run_sync(func, *args, limiter=_analysis_limiter)
+
+
+def _dataset_overview(profile) -> str:
+    """One-paragraph overview of a dataset profile."""
+    dataset_overview = f"Dataset contains {profile.n_rows:,} rows and {profile.n_cols} columns. "
+    missing_total = sum(profile.null_counts.values())
+    missing_pct = (missing_total / (profile.n_rows * profile.n_cols) * 100) if profile.n_rows * profile.n_cols > 0 else 0
+    dataset_overview += f"Missing values: {missing_total:,} ({missing_pct:.2f}%). "
+    dataset_overview += f"Columns: {', '.join(profile.columns[:5])}"
+    if len(profile.columns) > 5:
+        dataset_overview += f" and {len(profile.columns) - 5} more."
+    if profile.sampling_note:
+        dataset_overview += f" {profile.sampling_note}"
+    return dataset_overview
+
+
+def _report_response_data(
+    profile, insights, summary, chart_assets, include_reports: bool, tier: QualityTier = QualityTier(0)
+) -> dict:
+    """
+    Store a finished analysis and build its JSON response body.
+    
+    Charts and reports are linked to the /reports endpoints unless
+    include_reports inlines them (the HTML report only when tier allows).
+    """
+    renderer = ReportRenderer(profile, insights, summary, chart_assets)
+    report_id = report_store.add(renderer)
+    base_url = f"/reports/{report_id}"
+    for i, (insight, asset) in enumerate(zip(insights, chart_assets)):
+        if asset:
+            insight.chart_path = f"{base_url}/charts/{i}.png"
+    
+    report = Report(
+        dataset_overview=_dataset_overview(profile),
+        insights=insights,
+        summary=summary,
+        charts=[
+            (asset.data_uri if include_reports else f"{base_url}/charts/{i}.png") if asset else None
+            for i, asset in enumerate(chart_assets)
+        ],
+        markdown_report=renderer.markdown if include_reports else None,
+        html_report=renderer.html() if include_reports and tier.inline_html else None,
+        report_id=report_id,
+        links={'markdown': f"{base_url}.md", 'html': f"{base_url}.html"},
+        quality_tier=tier.name
+    )
+    
+    # Pydantic models are left in place and serialized straight to bytes by json_response
+    response_data = dict(report)
+    response_data['profile'] = {
+        'n_rows': profile.n_rows,
+        'n_cols': profile.n_cols,
+        'columns': profile.columns,
+        'dtypes': profile.dtypes,
+        'null_counts': profile.null_counts,
+        'unique_counts': profile.unique_counts,
+        'sampled_rows': profile.sampled_rows,
+    }
+    return response_data
+
+
+async def _run_analysis(
+    request: Request, file: UploadFile, include_reports: bool, session: Optional[ProfileSession] = None
+) -> Response:
+    """
+    Validate and save the upload for analyze_csv, then run the pipeline.
+    
+    The pipeline runs on a worker thread, which is also the only thread
+    profiled when session is given.
     """
     try:
         # Validate file type
@@ -55,7 +242,8 @@ async def analyze_csv(file: UploadFile = File(...)):
         
         # Save uploaded file temporarily
         with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-            content = await file.read()
+            with stage("upload"):
+                content = await file.read()
             
             # Validate file is not empty
             if len(content) == 0:
@@ -76,75 +264,15 @@ async def analyze_csv(file: UploadFile = File(...)):
             tmp_file_path = tmp_file.name
         
         try:
-            # Step 1: Profile the dataset
-            profile = profile_dataset(tmp_file_path)
-            
-            # Step 2: Generate insights
-            insights = generate_insights(profile)
-            
-            # Step 3: Generate charts
-            chart_paths = []
-            chart_base64 = []
-            for i, insight in enumerate(insights):
-                try:
-                    chart_path = generate_chart(insight, tmp_file_path, i)
-                    if chart_path and os.path.exists(chart_path):
-                        chart_paths.append(chart_path)
-                        # Read chart and convert to base64
-                        with open(chart_path, 'rb') as f:
-                            chart_data = base64.b64encode(f.read()).decode('utf-8')
-                            chart_base64.append(f"data:image/png;base64,{chart_data}")
-                    else:
-                        logger.warning(f"Chart generation failed for insight {i}, using None")
-                        chart_paths.append(None)
-                        chart_base64.append(None)
-                except Exception as e:
-                    logger.error(f"Error generating chart for insight {i}: {e}", exc_info=True)
-                    chart_paths.append(None)
-                    chart_base64.append(None)
-            
-            # Update insights with chart paths
-            for i, insight in enumerate(insights):
-                if i < len(chart_paths) and chart_paths[i]:
-                    insight.chart_path = chart_paths[i]
-            
-            # Step 4: Generate executive summary
-            summary = generate_summary(profile, insights)
-            
-            # Step 5: Generate reports
-            md_report, html_report = generate_reports(profile, insights, summary, chart_paths)
-            
-            # Step 6: Create dataset overview text
-            dataset_overview = f"Dataset contains {profile.n_rows:,} rows and {profile.n_cols} columns. "
-            missing_total = sum(profile.null_counts.values())
-            missing_pct = (missing_total / (profile.n_rows * profile.n_cols) * 100) if profile.n_rows * profile.n_cols > 0 else 0
-            dataset_overview += f"Missing values: {missing_total:,} ({missing_pct:.2f}%). "
-            dataset_overview += f"Columns: {', '.join(profile.columns[:5])}"
-            if len(profile.columns) > 5:
-                dataset_overview += f" and {len(profile.columns) - 5} more."
-            
-            # Create report object
-            report = Report(
-                dataset_overview=dataset_overview,
-                insights=insights,
-                summary=summary,
-                charts=chart_base64,
-                markdown_report=md_report,
-                html_report=html_report
-            )
-            
-            # Return response with profile data for frontend
-            response_data = report.model_dump()
-            response_data['profile'] = {
-                'n_rows': profile.n_rows,
-                'n_cols': profile.n_cols,
-                'columns': profile.columns,
-                'dtypes': profile.dtypes,
-                'null_counts': profile.null_counts,
-                'unique_counts': profile.unique_counts,
-            }
-            
-            return JSONResponse(content=response_data)
+            with quality_policy.admit() as tier:
+                pipeline = functools.partial(_analyze_file, tmp_file_path, include_reports, tier, _client_id(request))
+                if session is not None:
+                    pipeline = functools.partial(session.run, pipeline)
+                response_data = await _run_pipeline(pipeline)
+            with stage("serialize"):
+                response = json_response(request, response_data)
+            response.headers['X-Quality-Tier'] = tier.name
+            return response
             
         finally:
             # Clean up temporary file
@@ -153,6 +281,9 @@ async def analyze_csv(file: UploadFile = File(...)):
                 
     except HTTPException:
         raise
+    except LLMQueueTimeout as e:
+        logger.warning(f"Rejected analyze_csv under LLM backpressure: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except ValueError as e:
         logger.error(f"ValueError in analyze_csv: {str(e)}", exc_info=True)
         raise HTTPException(status_code=400, detail=str(e))
@@ -161,6 +292,267 @@ async def analyze_csv(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+def _analyze_file(tmp_file_path: str, include_reports: bool, tier: QualityTier, client: str) -> dict:
+    """
+    Profile, generate insights, charts and summary for an uploaded CSV at the given quality tier.
+    
+    Blocking (LLM calls wait for the scheduler), so it runs on a worker thread.
+    
+    Returns:
+        Response body for _report_response_data
+    """
+    # Heavy dependencies (pandas, matplotlib, LangChain) load on first use or during warm-up
+    from app.profiler import profile_dataset
+    from app.agent import brief_summary, generate_insights, generate_summary
+    from app.charts import generate_chart
+    from app.aggregates import dataset_cache
+    
+    if tier.name != "full":
+        logger.info(f"Analyzing at reduced quality tier: {tier.name}")
+    
+    # Step 1: Profile the dataset
+    with stage("profile"):
+        profile = profile_dataset(tmp_file_path, sample_rows=PROFILE_SAMPLE_ROWS if tier.sampled_profile else None)
+    
+    if tier.profile_only:
+        return _report_response_data(profile, [], brief_summary(profile, []), [], include_reports, tier)
+    
+    # Step 2: Generate insights
+    with stage("insights"):
+        insights = generate_insights(profile, INTERACTIVE, client)
+    
+    # Step 3: Generate charts, served from the profile's aggregate index where possible.
+    # Each request renders into its own directory so concurrent requests can't
+    # overwrite each other's files; the PNGs are kept in memory once encoded.
+    chart_assets = []
+    chart_dir = tempfile.mkdtemp(prefix="charts_")
+    try:
+        with stage("charts"):
+            aggregates = dataset_cache.index_for(tmp_file_path)
+            for i, insight in enumerate(insights):
+                try:
+                    chart_path = generate_chart(
+                        insight, tmp_file_path, i, output_dir=chart_dir, aggregates=aggregates, dpi=tier.chart_dpi
+                    )
+                    # Read and encode the chart once; the reports reuse the same asset
+                    asset = encode_chart_asset(chart_path)
+                    if not asset:
+                        logger.warning(f"Chart generation failed for insight {i}, using None")
+                    chart_assets.append(asset)
+                except Exception as e:
+                    logger.error(f"Error generating chart for insight {i}: {e}", exc_info=True)
+                    chart_assets.append(None)
+    finally:
+        shutil.rmtree(chart_dir, ignore_errors=True)
+    
+    # Step 4: Generate executive summary
+    with stage("summary"):
+        if tier.skip_summary:
+            summary = brief_summary(profile, insights)
+        else:
+            summary = generate_summary(profile, insights, INTERACTIVE, client)
+    
+    # Step 5: Store the report and build the response body; each report
+    # format is only rendered when requested
+    return _report_response_data(profile, insights, summary, chart_assets, include_reports, tier)
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    include_reports: bool = Query(False)
+):
+    """
+    Analyze many CSV files (uploaded individually or as zip archives) in one call.
+    
+    Files run through the shared batch scheduler: parallel profiling, LLM
+    calls at batch priority and a shared chart worker pool. A
+    file that fails doesn't fail the batch.
+    
+    Args:
+        request: Incoming request
+        files: CSV files and/or zip archives of CSV files
+        include_reports: Whether to inline base64 charts and both reports per file
+        
+    Returns:
+        Per-file reports (same shape as /analyze) plus a combined overview
+    """
+    members = []
+    remaining_bytes = int(BATCH_MAX_TOTAL_MB * 1024 * 1024)
+    try:
+        with stage("upload"):
+            for upload in files:
+                content = await upload.read()
+                filename = upload.filename or "upload"
+                if filename.lower().endswith('.zip'):
+                    extracted = extract_zip(content, BATCH_MAX_FILES, remaining_bytes)
+                else:
+                    validate_csv(filename, len(content))
+                    extracted = [(filename, content)]
+                remaining_bytes -= sum(len(data) for _, data in extracted)
+                if remaining_bytes < 0:
+                    raise ValueError(f"Batch exceeds the maximum total size of {BATCH_MAX_TOTAL_MB:g}MB")
+                members.extend(extracted)
+        if len(members) > BATCH_MAX_FILES:
+            raise ValueError(f"Batch contains {len(members)} CSV files. Maximum allowed is {BATCH_MAX_FILES}.")
+    except ValueError as e:
+        logger.error(f"Invalid batch upload: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Batch uploaded: {len(members)} files")
+    
+    workdir = tempfile.mkdtemp(prefix="batch_")
+    try:
+        items = []
+        for i, (filename, content) in enumerate(members):
+            path = os.path.join(workdir, f"{i}.csv")
+            with open(path, 'wb') as f:
+                f.write(content)
+            items.append(BatchFile(filename, path))
+        
+        with stage("batch"):
+            results = await _run_pipeline(batch_scheduler.run, items, _client_id(request))
+        
+        reports = []
+        for result in results:
+            if result.error is not None:
+                reports.append({'filename': result.filename, 'status': 'error', 'error': result.error})
+            else:
+                reports.append({
+                    'filename': result.filename,
+                    'status': 'ok',
+                    **_report_response_data(result.profile, result.insights, result.summary, result.charts, include_reports),
+                })
+        
+        with stage("serialize"):
+            return json_response(request, {'overview': combined_overview(results), 'reports': reports})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _get_report(report_id: str) -> ReportRenderer:
+    """Look up a stored report or raise 404."""
+    renderer = report_store.get(report_id)
+    if renderer is None:
+        raise HTTPException(status_code=404, detail="Report not found or expired")
+    return renderer
+
+
+@app.get("/reports/report.css")
+async def get_report_stylesheet(request: Request):
+    """Stylesheet linked by HTML reports rendered with embed=false."""
+    return negotiated_response(
+        request,
+        REPORT_CSS.encode('utf-8'),
+        "text/css",
+        headers={'Cache-Control': 'public, max-age=86400'},
+    )
+
+
+@app.get("/reports/{report_id}/charts/{index}.png")
+async def get_report_chart(report_id: str, index: int, request: Request):
+    """
+    Serve a chart PNG for a stored report.
+    
+    The ETag is the chart's content hash, so browsers revalidate with
+    If-None-Match and get a 304 without the image being resent.
+    """
+    renderer = _get_report(report_id)
+    asset = renderer.charts[index] if 0 <= index < len(renderer.charts) else None
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    
+    etag = f'"{asset.digest}"'
+    headers = {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=asset.png, media_type="image/png", headers=headers)
+
+
+@app.get("/reports/{report_id}.md")
+async def get_markdown_report(report_id: str, request: Request):
+    """Render (once) and return the Markdown report."""
+    renderer = _get_report(report_id)
+    return negotiated_response(
+        request,
+        renderer.markdown.encode('utf-8'),
+        "text/markdown",
+        headers={'Cache-Control': 'private, max-age=3600'},
+    )
+
+
+@app.get("/reports/{report_id}.html")
+async def get_html_report(report_id: str, request: Request, embed: bool = Query(True)):
+    """
+    Render (once per variant) and return the HTML report.
+    
+    Args:
+        report_id: Id returned by /analyze
+        request: Incoming request
+        embed: Inline charts and CSS for a self-contained file; when false,
+            charts and the stylesheet are referenced by URL
+    """
+    renderer = _get_report(report_id)
+    if embed:
+        html = renderer.html()
+    else:
+        html = renderer.html(
+            chart_url=f"/reports/{report_id}/charts/{{index}}.png",
+            stylesheet_url="/reports/report.css",
+        )
+    return negotiated_response(
+        request,
+        html.encode('utf-8'),
+        "text/html",
+        headers={
+            'Cache-Control': 'private, max-age=3600',
+            'Content-Security-Policy': REPORT_CSP,
+        },
+    )
+
+
+def _get_profile(profile_id: str, request: Request):
+    """
+    Look up a stored profile for an admin.
+    
+    Profiles expose stacks and allocation sites, so they are never served
+    without an admin token: 404 when none is configured, 403 when the
+    request doesn't carry it.
+    """
+    if not PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Profiling admin token required")
+    session = profile_store.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return session
+
+
+@app.get("/profiles/{profile_id}.json")
+async def get_profile_summary(profile_id: str, request: Request):
+    """Per-stage timings and allocation peaks plus top allocation sites."""
+    return json_response(request, _get_profile(profile_id, request).summary())
+
+
+@app.get("/profiles/{profile_id}.pstats")
+async def get_profile_pstats(profile_id: str, request: Request):
+    """cProfile output, loadable with pstats.Stats or snakeviz."""
+    session = _get_profile(profile_id, request)
+    return Response(
+        content=session.pstats_bytes(),
+        media_type="application/octet-stream",
+        headers={'Content-Disposition': f'attachment; filename="{profile_id}.pstats"'},
+    )
+
+
+@app.get("/profiles/{profile_id}.collapsed")
+async def get_profile_collapsed(profile_id: str, request: Request):
+    """Sampled stacks in collapsed format for flamegraph.pl or speedscope."""
+    session = _get_profile(profile_id, request)
+    return negotiated_response(request, session.collapsed_stacks().encode('utf-8'), "text/plain")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
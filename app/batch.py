@@ -0,0 +1,283 @@
+"""Batch analysis of many CSVs through shared worker pools."""
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+from app.config import BATCH_WORKERS, BATCH_ZIP_MAX_RATIO, CHART_WORKERS, MAX_FILE_SIZE_MB
+from app.formatter import encode_chart_asset
+from app.metrics import QUEUE_DEPTH, record_chart, stage
+from app.schemas import ChartAsset, DatasetProfile, Insight
+
+logger = logging.getLogger(__name__)
+
+# Bytes decompressed at a time from a zip member
+ZIP_READ_CHUNK = 64 * 1024
+
+
+class BatchFile(NamedTuple):
+    """A CSV submitted to a batch, saved to a temporary path."""
+    filename: str
+    path: str
+
+
+class BatchResult(NamedTuple):
+    """Outcome of analyzing one file; error is set when the pipeline failed."""
+    filename: str
+    profile: Optional[DatasetProfile] = None
+    insights: Optional[List[Insight]] = None
+    summary: Optional[str] = None
+    charts: Optional[List[Optional[ChartAsset]]] = None
+    error: Optional[str] = None
+
+
+def _render_chart(
+    insight: Insight, csv_path: str, index: int, output_dir: str, aggregates
+) -> Tuple[Optional[str], List[Tuple[str, float, bool]]]:
+    """
+    Chart worker entry point (runs in a worker process); aggregates is the parent's AggregateIndex.
+    
+    Returns the chart path and the render attempts. Metrics recorded here would
+    stay in the worker's registry, so the parent records the attempts instead.
+    """
+    from app.charts import generate_chart
+    attempts = []
+    chart_path = generate_chart(
+        insight, csv_path, index, output_dir=output_dir, aggregates=aggregates,
+        record=lambda *attempt: attempts.append(attempt),
+    )
+    return chart_path, attempts
+
+
+def _init_chart_worker():
+    """Import the chart stack once per worker process."""
+    import app.charts  # noqa: F401
+
+
+def validate_csv(filename: str, size: int):
+    """Apply the single-file upload rules to one batch member."""
+    if not filename.lower().endswith('.csv'):
+        raise ValueError(f"{filename}: file must be a CSV file")
+    if size == 0:
+        raise ValueError(f"{filename}: file is empty")
+    if size > MAX_FILE_SIZE_MB * 1024 * 1024:
+        raise ValueError(
+            f"{filename}: file size ({size / (1024 * 1024):.2f}MB) exceeds maximum allowed size ({MAX_FILE_SIZE_MB}MB)"
+        )
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int) -> bytes:
+    """
+    Decompress one zip member in chunks, stopping as soon as it grows past a limit.
+
+    The sizes in the member's header are not trusted: decompression stops at
+    max_bytes, or once the output exceeds BATCH_ZIP_MAX_RATIO times the
+    compressed size.
+    """
+    chunks = []
+    size = 0
+    with archive.open(info) as member:
+        while True:
+            chunk = member.read(ZIP_READ_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(
+                    f"{info.filename}: decompressed size exceeds the {max_bytes / (1024 * 1024):.2f}MB "
+                    "left within the file and batch size limits"
+                )
+            if size > ZIP_READ_CHUNK and size > max(info.compress_size, 1) * BATCH_ZIP_MAX_RATIO:
+                raise ValueError(f"{info.filename}: compression ratio exceeds {BATCH_ZIP_MAX_RATIO:g}:1")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def extract_zip(content: bytes, max_files: int, max_total_bytes: int) -> List[Tuple[str, bytes]]:
+    """
+    Return (filename, bytes) for every CSV in a zip archive.
+
+    Declared member sizes are checked against MAX_FILE_SIZE_MB before
+    anything is decompressed, so honestly oversized archives are rejected
+    cheaply. Members are then decompressed in chunks with hard limits (per
+    file, max_total_bytes across the archive, and BATCH_ZIP_MAX_RATIO), so a
+    forged header or a zip bomb can't exhaust memory.
+
+    Args:
+        content: Zip archive bytes
+        max_files: Maximum number of CSVs accepted
+        max_total_bytes: Maximum decompressed size of all CSVs together
+
+    Returns:
+        List of (filename, content) pairs
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        raise ValueError("Archive is not a valid zip file")
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename.lower().endswith('.csv')
+        and not os.path.basename(info.filename).startswith('.') and '__MACOSX' not in info.filename
+    ]
+    if not members:
+        raise ValueError("Archive contains no CSV files")
+    if len(members) > max_files:
+        raise ValueError(f"Archive contains {len(members)} CSV files. Maximum allowed is {max_files}.")
+    for info in members:
+        validate_csv(info.filename, info.file_size)
+    extracted = []
+    remaining = max_total_bytes
+    try:
+        for info in members:
+            data = _read_member(archive, info, min(MAX_FILE_SIZE_MB * 1024 * 1024, remaining))
+            validate_csv(info.filename, len(data))
+            remaining -= len(data)
+            extracted.append((os.path.basename(info.filename), data))
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        raise ValueError(f"Archive is corrupt: {e}")
+    return extracted
+
+
+def combined_overview(results: List[BatchResult]) -> dict:
+    """Summarize a batch across files: totals, shared columns and failures."""
+    succeeded = [r for r in results if r.error is None]
+    total_rows = sum(r.profile.n_rows for r in succeeded)
+    total_missing = sum(sum(r.profile.null_counts.values()) for r in succeeded)
+    column_files = {}
+    for r in succeeded:
+        for col in r.profile.columns:
+            column_files[col] = column_files.get(col, 0) + 1
+    shared = [col for col, count in column_files.items() if count == len(succeeded)] if succeeded else []
+
+    text = f"Analyzed {len(succeeded)} of {len(results)} files with {total_rows:,} rows in total. "
+    if shared:
+        text += f"Columns present in every file: {', '.join(shared[:5])}"
+        text += f" and {len(shared) - 5} more. " if len(shared) > 5 else ". "
+    if len(succeeded) < len(results):
+        text += f"Failed: {', '.join(r.filename for r in results if r.error is not None)}."
+    return {
+        "files": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "total_rows": total_rows,
+        "total_missing": total_missing,
+        "shared_columns": shared,
+        "column_file_counts": column_files,
+        "text": text.strip(),
+    }
+
+
+class BatchScheduler:
+    """
+    Runs the analysis pipeline for many files over shared pools.
+
+    Files are profiled in parallel on a thread pool, LLM calls go through the
+    shared LLM scheduler at batch priority, and charts from all files are rendered by
+    one pool of worker processes (matplotlib's pyplot state and the draw-time
+    reduction layer are process-global, so charts can't run on threads).
+    """
+
+    def __init__(
+        self,
+        workers: int = BATCH_WORKERS,
+        chart_workers: int = CHART_WORKERS
+    ):
+        self.workers = workers
+        self.chart_workers = chart_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._chart_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch")
+            return self._pool
+
+    @property
+    def chart_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._chart_pool is None:
+                # spawn: forking a threaded server process is unsafe
+                self._chart_pool = ProcessPoolExecutor(
+                    max_workers=self.chart_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_chart_worker,
+                )
+            return self._chart_pool
+
+    def prime(self):
+        """Start the chart worker processes ahead of the first batch."""
+        futures = [self.chart_pool.submit(os.getpid) for _ in range(self.chart_workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            if self._chart_pool is not None:
+                self._chart_pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._chart_pool = None
+
+    def _analyze(self, item: BatchFile, client: str) -> BatchResult:
+        from app.profiler import profile_dataset
+        from app.agent import generate_insights, generate_summary
+        from app.llm_scheduler import BATCH
+        from app.aggregates import dataset_cache
+
+        output_dir = tempfile.mkdtemp(prefix="batch_charts_")
+        try:
+            with stage("batch_profile"):
+                profile = profile_dataset(item.path)
+            with stage("batch_insights"):
+                insights = generate_insights(profile, priority=BATCH, client=client)
+
+            # Charts render on the shared process pool while the summary call runs;
+            # workers don't share the dataset cache, so the aggregate index is sent along
+            aggregates = dataset_cache.index_for(item.path)
+            chart_futures = [
+                self.chart_pool.submit(_render_chart, insight, item.path, i, output_dir, aggregates)
+                for i, insight in enumerate(insights)
+            ]
+            with stage("batch_summary"):
+                summary = generate_summary(profile, insights, priority=BATCH, client=client)
+
+            charts = []
+            with stage("batch_charts"):
+                for i, future in enumerate(chart_futures):
+                    try:
+                        chart_path, attempts = future.result()
+                        for attempt in attempts:
+                            record_chart(*attempt)
+                        charts.append(encode_chart_asset(chart_path))
+                    except Exception as e:
+                        logger.error(f"Error generating chart {i} for {item.filename}: {e}", exc_info=True)
+                        charts.append(None)
+            return BatchResult(item.filename, profile, insights, summary, charts)
+        except Exception as e:
+            logger.error(f"Batch analysis failed for {item.filename}: {e}", exc_info=True)
+            return BatchResult(item.filename, error=str(e))
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    def run(self, items: List[BatchFile], client: str = "anonymous") -> List[BatchResult]:
+        """Analyze every file; results keep the input order and failures don't abort the batch."""
+        QUEUE_DEPTH.labels(queue="batch_files").inc(len(items))
+
+        def analyze(item):
+            QUEUE_DEPTH.labels(queue="batch_files").dec()
+            return self._analyze(item, client)
+
+        return list(self.pool.map(analyze, items))
+
+
+batch_scheduler = BatchScheduler()
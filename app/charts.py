@@ -1,17 +1,34 @@
 """Chart generation and execution module."""
 import os
+import re
+import time
 import logging
+import threading
 import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
-from typing import Optional
-from app.config import CHARTS_DIR
-from app.schemas import Insight
+from matplotlib.figure import Figure
+from typing import Callable, NamedTuple, Optional
+from app.aggregates import AggregateIndex, dataset_cache
+from app.config import CHARTS_DIR, CHART_DPI, CHART_MAX_POINTS
+from app.schemas import Insight, ChartSpec
+from app.metrics import record_chart
+from app.profiling import profiled_stage
+from app.downsample import uniform_sample, lttb, prebin, numeric_positions, reduced_plotting
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of categories drawn in a native bar chart
+MAX_BAR_CATEGORIES = 30
+DEFAULT_HISTOGRAM_BINS = 30
+
+# pyplot's current figure and axes are process-global, so code that draws
+# through plt (exec'd chart code, warm-up) must hold this while it runs.
+# Native charts build their own Figure and don't need it.
+pyplot_lock = threading.Lock()
+
 # Allowed modules for import
 ALLOWED_MODULES = {
     'matplotlib': matplotlib,
@@ -58,6 +75,268 @@ def ensure_charts_directory():
     os.makedirs(CHARTS_DIR, exist_ok=True)
 
 
+def load_dataframe(csv_path: str) -> pd.DataFrame:
+    """Load the CSV file used for chart rendering."""
+    try:
+        return pd.read_csv(csv_path, encoding='utf-8')
+    except UnicodeDecodeError:
+        return pd.read_csv(csv_path, encoding='latin-1')
+
+
+def _require_column(df: pd.DataFrame, column: Optional[str]) -> str:
+    """Ensure a column referenced by a chart spec exists."""
+    if not column or column not in df.columns:
+        raise ValueError(f"Chart spec references unknown column: {column!r}")
+    return column
+
+
+class ChartData(NamedTuple):
+    """Reduced data for a spec chart, ready to draw."""
+    x: np.ndarray  # Bar labels, histogram bin edges or x values
+    y: np.ndarray  # Bar heights, bin counts or y values
+    ylabel: str
+
+
+def chart_data_from_frame(spec: ChartSpec, df: pd.DataFrame) -> ChartData:
+    """
+    Compute the data for a chart spec from the raw dataset.
+    
+    Histograms are binned with np.histogram and scatter/line charts are
+    reduced to CHART_MAX_POINTS (uniform sampling and LTTB), so the drawn
+    data does not grow with row count.
+    
+    Args:
+        spec: ChartSpec describing the chart
+        df: Loaded dataset
+        
+    Returns:
+        ChartData for draw_chart
+    """
+    x = _require_column(df, spec.x)
+    
+    if spec.type == "histogram":
+        values = pd.to_numeric(df[x], errors='coerce').to_numpy(dtype=float)
+        if np.isnan(values).all():
+            raise ValueError(f"Column {x!r} has no numeric values to bin")
+        counts, edges = prebin(values, bins=spec.bins or DEFAULT_HISTOGRAM_BINS)
+        return ChartData(edges, counts, "Count")
+    
+    if spec.type == "bar":
+        if spec.y is None or spec.aggregation == "count":
+            series = df[x].value_counts()
+            ylabel = "Count"
+        else:
+            y = _require_column(df, spec.y)
+            series = df.groupby(x)[y].agg(spec.aggregation or "mean").sort_values(ascending=False)
+            ylabel = f"{spec.aggregation or 'mean'} of {y}"
+        series = series.head(MAX_BAR_CATEGORIES)
+        return ChartData(series.index.astype(str).to_numpy(), series.to_numpy(), ylabel)
+    
+    y = _require_column(df, spec.y)
+    if spec.type == "scatter":
+        points = df[[x, y]].dropna()
+        idx = uniform_sample(len(points), CHART_MAX_POINTS)
+        return ChartData(points[x].to_numpy()[idx], points[y].to_numpy()[idx], y)
+    
+    # line
+    if spec.aggregation:
+        series = df.groupby(x)[y].agg(spec.aggregation)
+    else:
+        series = df[[x, y]].dropna().sort_values(x).set_index(x)[y]
+    xs, ys = series.index.to_numpy(), series.to_numpy(dtype=float)
+    x_num = numeric_positions(xs)
+    if x_num is not None:
+        idx = lttb(x_num, ys, CHART_MAX_POINTS)
+    else:
+        idx = uniform_sample(len(series), CHART_MAX_POINTS)
+    return ChartData(xs[idx], ys[idx], y if not spec.aggregation else f"{spec.aggregation} of {y}")
+
+
+def chart_data_from_index(spec: ChartSpec, index: AggregateIndex, exact: bool = False) -> Optional[ChartData]:
+    """
+    Answer a chart spec from the aggregate index without touching the rows.
+    
+    Args:
+        spec: ChartSpec describing the chart
+        index: AggregateIndex built when the dataset was profiled
+        exact: Reproduce what the equivalent pandas/matplotlib code draws
+            (every bar, in pandas order) rather than the native spec rendering
+            (top MAX_BAR_CATEGORIES bars by height)
+        
+    Returns:
+        ChartData, or None when the index can't answer the spec
+    """
+    if spec.type == "histogram":
+        binned = index.histogram(spec.x, spec.bins or DEFAULT_HISTOGRAM_BINS)
+        return ChartData(binned[1], binned[0], "Count") if binned is not None else None
+    
+    if spec.type == "bar":
+        if spec.y is None or spec.aggregation == "count":
+            series = index.top_values(spec.x, None if exact else MAX_BAR_CATEGORIES)
+            ylabel = "Count"
+        else:
+            series = index.group_aggregate(spec.x, spec.y, spec.aggregation or "mean")
+            if series is not None and not exact:
+                series = series.sort_values(ascending=False).head(MAX_BAR_CATEGORIES)
+            ylabel = f"{spec.aggregation or 'mean'} of {spec.y}"
+        if series is None:
+            return None
+        return ChartData(series.index.astype(str).to_numpy(), series.to_numpy(), ylabel)
+    
+    if spec.type == "scatter" and spec.y is not None:
+        points = index.scatter_points(spec.x, spec.y)
+        if points is None:
+            return None
+        return ChartData(points[spec.x].to_numpy(), points[spec.y].to_numpy(), spec.y)
+    
+    return None
+
+
+def draw_chart(spec: ChartSpec, data: ChartData, output_path: str, dpi: int = CHART_DPI) -> bool:
+    """
+    Draw reduced chart data and save it to output_path at dpi.
+    
+    Returns:
+        True if successful, False otherwise
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    try:
+        if spec.type == "histogram":
+            ax.stairs(data.y, data.x, fill=True, alpha=0.8)
+        elif spec.type == "bar":
+            ax.bar(data.x, data.y)
+            ax.tick_params(axis='x', rotation=45)
+        elif spec.type == "scatter":
+            ax.scatter(data.x, data.y, s=10, alpha=0.6)
+        else:
+            ax.plot(data.x, data.y)
+        ax.set_xlabel(spec.xlabel if spec.xlabel is not None else spec.x)
+        ax.set_ylabel(spec.ylabel if spec.ylabel is not None else data.ylabel)
+        if spec.title:
+            ax.set_title(spec.title)
+        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+        return True
+    except Exception as e:
+        logger.warning(f"Native chart rendering failed, falling back to chart code: {e}")
+        return False
+
+
+def render_chart_spec(spec: ChartSpec, df: pd.DataFrame, output_path: str, dpi: int = CHART_DPI) -> bool:
+    """
+    Render a declarative chart spec natively with pre-aggregated data.
+    
+    Args:
+        spec: ChartSpec describing the chart
+        df: Loaded dataset
+        output_path: Path where the chart should be saved
+        dpi: Resolution of the saved image
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        data = chart_data_from_frame(spec, df)
+    except Exception as e:
+        logger.warning(f"Native chart rendering failed, falling back to chart code: {e}")
+        return False
+    return draw_chart(spec, data, output_path, dpi)
+
+
+# Chart code lines that don't change what data is drawn
+_CODE_NOISE = re.compile(
+    r"^(?:import\s|from\s|#"
+    r"|(?:df|data)\s*=\s*(?:pd|pandas)\.read_\w+\(.*\)$"
+    r"|plt\.(?:figure|xticks|yticks|tight_layout|grid|savefig|close|show)\(.*\)$)"
+)
+# Title and axis labels given as string literals are carried over to the spec
+_CODE_LABEL = re.compile(r"""^plt\.(?P<field>title|xlabel|ylabel)\((['"])(?P<text>[^'"]*)\2\s*(?:,.*)?\)$""")
+_COLUMN = r"""(?:df|data)\[['"](?P<{name}>[^'"]+)['"]\]"""
+_BAR_PLOT = r"""\.plot(?:\.bar\(|\(\s*kind\s*=\s*['"]bar['"]\s*,?)"""
+_CODE_OPERATIONS = [
+    ("histogram", re.compile(
+        r"^plt\.hist\(" + _COLUMN.format(name="x") + r"(?:\.dropna\(\))?(?P<kwargs>.*)\)$"
+    )),
+    ("histogram", re.compile(
+        r"^" + _COLUMN.format(name="x")
+        + r"""(?:\.dropna\(\))?(?:\.hist\(|\.plot\.hist\(|\.plot\(\s*kind\s*=\s*['"]hist['"]\s*,?)(?P<kwargs>.*)\)$"""
+    )),
+    ("bar", re.compile(
+        r"^" + _COLUMN.format(name="x") + r"\.value_counts\(\)" + _BAR_PLOT + r"(?P<kwargs>.*)\)$"
+    )),
+    ("bar", re.compile(
+        r"""^(?:df|data)\.groupby\(['"](?P<x>[^'"]+)['"]\)\[['"](?P<y>[^'"]+)['"]\]"""
+        r"\.(?P<aggregation>count|sum|mean|median|min|max)\(\)" + _BAR_PLOT + r"(?P<kwargs>.*)\)$"
+    )),
+    ("scatter", re.compile(
+        r"^plt\.scatter\(" + _COLUMN.format(name="x") + r"\s*,\s*" + _COLUMN.format(name="y") + r"(?P<kwargs>.*)\)$"
+    )),
+]
+# Keyword arguments that change the data drawn, so the code can't be answered from the index
+_DATA_KWARGS = re.compile(
+    r"\b(?:density|range|weights|cumulative|log|logy|stacked|orientation|histtype|bottom|by|subplots|normed)\s*="
+)
+
+
+def infer_chart_spec(chart_code: str) -> Optional[ChartSpec]:
+    """
+    Recognize chart code that is one common pandas/matplotlib operation on df.
+    
+    Matches a histogram, value counts or groupby aggregation bar chart, or a
+    scatter of two columns, surrounded only by labelling and saving calls.
+    The title and axis labels are carried over when they are string literals
+    (any other label expression declines the match). Styling arguments
+    (colours, alpha, sizes) are not; the chart shows the same data in the
+    native style.
+    
+    Args:
+        chart_code: LLM-generated chart code
+        
+    Returns:
+        Equivalent ChartSpec, or None if the code does anything else
+    """
+    spec = None
+    labels = {}
+    for line in chart_code.splitlines():
+        line = line.strip()
+        if not line or _CODE_NOISE.match(line):
+            continue
+        label_match = _CODE_LABEL.match(line)
+        if label_match:
+            labels[label_match.group("field")] = label_match.group("text")
+            continue
+        if spec is not None:
+            return None
+        for chart_type, pattern in _CODE_OPERATIONS:
+            match = pattern.match(line)
+            if match:
+                break
+        else:
+            return None
+        fields = match.groupdict()
+        kwargs = fields.pop("kwargs")
+        if _DATA_KWARGS.search(kwargs):
+            return None
+        bins = None
+        if chart_type == "histogram":
+            bins_match = re.search(r"\bbins\s*=\s*(\d+)\s*(?:,|$)", kwargs)
+            if "bins" in kwargs and not bins_match:
+                return None
+            # matplotlib's and pandas' default
+            bins = int(bins_match.group(1)) if bins_match else 10
+        if chart_type == "bar" and fields.get("aggregation") is None:
+            fields["aggregation"] = "count"
+        try:
+            spec = ChartSpec(type=chart_type, bins=bins, **fields)
+        except ValueError:
+            return None
+    if spec is not None:
+        for field, text in labels.items():
+            setattr(spec, field, text)
+    return spec
+
+
+@profiled_stage("execute_chart_code")
 def execute_chart_code(chart_code: str, csv_path: str, output_path: str) -> bool:
     """
     Execute matplotlib code in a sandboxed environment.
@@ -99,16 +378,18 @@ def execute_chart_code(chart_code: str, csv_path: str, output_path: str) -> bool
         }
         
         # Load the CSV data
-        try:
-            df = pd.read_csv(csv_path, encoding='utf-8')
-        except UnicodeDecodeError:
-            df = pd.read_csv(csv_path, encoding='latin-1')
+        df = load_dataframe(csv_path)
         
         safe_globals['df'] = df
         safe_globals['data'] = df
         
-        # Execute the chart code
-        exec(chart_code, safe_globals)
+        # Execute the chart code, reducing large series to the point budget at draw time
+        with pyplot_lock, reduced_plotting(CHART_MAX_POINTS):
+            try:
+                exec(chart_code, safe_globals)
+            finally:
+                # Don't leave a half-drawn current figure for the next chart
+                plt.close('all')
         
         # Verify the file was created
         if not os.path.exists(output_path):
@@ -121,28 +402,77 @@ def execute_chart_code(chart_code: str, csv_path: str, output_path: str) -> bool
         return False
 
 
-def generate_chart(insight: Insight, csv_path: str, index: int) -> Optional[str]:
+def generate_chart(
+    insight: Insight,
+    csv_path: str,
+    index: int,
+    output_dir: Optional[str] = None,
+    aggregates: Optional[AggregateIndex] = None,
+    dpi: int = CHART_DPI,
+    record: Callable[[str, float, bool], None] = record_chart
+) -> Optional[str]:
     """
     Generate a chart for an insight.
     
+    Charts are answered from the dataset's aggregate index when possible:
+    the insight's chart_spec, or its chart_code when that is one common
+    operation (see infer_chart_spec). Otherwise the spec is rendered from
+    the raw data, and chart_code is executed as the last resort.
+    
     Args:
         insight: Insight object with chart_code
         csv_path: Path to the CSV file
         index: Index of the insight (for filename)
+        output_dir: Directory for the chart file (defaults to CHARTS_DIR)
+        aggregates: Aggregate index of the dataset (looked up in dataset_cache if omitted)
+        dpi: Resolution of the chart image, also applied to chart_code's savefig
+        record: Called with (path, seconds, success) for every render attempt;
+            chart worker processes pass a collector and the parent records them
         
     Returns:
         Path to the generated chart file, or None if failed
     """
-    ensure_charts_directory()
+    if output_dir is None:
+        ensure_charts_directory()
+        output_dir = CHARTS_DIR
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    output_path = os.path.join(output_dir, f"insight_{index}.png")
     
-    output_path = os.path.join(CHARTS_DIR, f"insight_{index}.png")
+    # Fastest path: answer the chart from the aggregate index built while profiling
+    if aggregates is None:
+        aggregates = dataset_cache.index_for(csv_path)
+    if aggregates is not None:
+        spec = insight.chart_spec or infer_chart_spec(insight.chart_code)
+        start = time.perf_counter()
+        data = chart_data_from_index(spec, aggregates, exact=insight.chart_spec is None) if spec else None
+        if data is not None:
+            rendered = draw_chart(spec, data, output_path, dpi) and os.path.exists(output_path)
+            record("index", time.perf_counter() - start, rendered)
+            if rendered:
+                logger.info(f"Chart rendered from aggregate index: {output_path}")
+                return output_path
+    
+    # Fast path: render the declarative spec natively when the LLM provided one
+    if insight.chart_spec is not None:
+        try:
+            df = load_dataframe(csv_path)
+        except Exception as e:
+            logger.error(f"Error loading data for chart spec: {e}", exc_info=True)
+        else:
+            start = time.perf_counter()
+            rendered = render_chart_spec(insight.chart_spec, df, output_path, dpi) and os.path.exists(output_path)
+            record("spec", time.perf_counter() - start, rendered)
+            if rendered:
+                logger.info(f"Chart rendered from spec: {output_path}")
+                return output_path
     
     # Modify chart code to use the correct output path
     chart_code = insight.chart_code
     
     # Normalize and fix import statements first
     # Remove problematic imports since we already provide plt, pd, np in globals
-    import re
     # Remove all import statements - we'll provide everything needed
     chart_code = re.sub(r'^import\s+.*?$', '', chart_code, flags=re.MULTILINE)
     chart_code = re.sub(r'^from\s+.*?import\s+.*?$', '', chart_code, flags=re.MULTILINE)
@@ -175,16 +505,19 @@ def generate_chart(insight: Insight, csv_path: str, index: int) -> Optional[str]
             f"plt.savefig('{output_path}'",
             chart_code
         )
+        chart_code = re.sub(r"(plt\.savefig\(.*?dpi\s*=\s*)\d+", rf"\g<1>{dpi}", chart_code)
     else:
         # Add savefig if not present
-        chart_code += f"\nplt.savefig('{output_path}', dpi=150, bbox_inches='tight')"
+        chart_code += f"\nplt.savefig('{output_path}', dpi={dpi}, bbox_inches='tight')"
     
     # Ensure plt.close() is called
     if 'plt.close()' not in chart_code:
         chart_code += "\nplt.close()"
     
     # Execute the chart code
+    start = time.perf_counter()
     success = execute_chart_code(chart_code, csv_path, output_path)
+    record("exec", time.perf_counter() - start, success)
     
     if success and os.path.exists(output_path):
         logger.info(f"Chart generated successfully: {output_path}")
@@ -14,11 +14,78 @@ MAX_COLUMNS = 20
 
 # Chart Configuration
 CHARTS_DIR = "charts"
+CHART_DPI = 150
+# When enabled, the LLM is asked for a declarative chart_spec rendered natively
+CHART_SPEC_MODE = os.getenv("CHART_SPEC_MODE", "false").lower() in ("1", "true", "yes")
+# Point budget for scatter/line/histogram data drawn by any chart
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "5000"))
+
+# Number of dataset profiles (with their chart aggregate index) kept in
+# memory, keyed by file content
+DATASET_CACHE_SIZE = int(os.getenv("DATASET_CACHE_SIZE", "32"))
+
+# Number of finished reports kept in memory for the /reports endpoints
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "100"))
+
+# Response compression (brotli is used when installed and accepted, else gzip)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Opt-in request profiling: requests carrying the admin token (X-Profile-Token
+# header) get CPU and allocation profiles; a random sample gets CPU profiles
+# only. Profiles can only be downloaded with the admin token
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "20"))
+
+# Prime imports, matplotlib and the Groq client on startup before reporting ready
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Batch analysis: files per request, files analyzed in parallel and chart
+# worker processes shared by all batches
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+# Limits on batch uploads: total size of all CSVs (after decompression) and
+# the highest compression ratio accepted for a zip member
+BATCH_MAX_TOTAL_MB = float(os.getenv("BATCH_MAX_TOTAL_MB", "50"))
+BATCH_ZIP_MAX_RATIO = float(os.getenv("BATCH_ZIP_MAX_RATIO", "100"))
+
+# LLM scheduling shared by every request: concurrent calls, provider rate
+# limits (0 disables; set to your Groq plan's limits) and how long a call may
+# wait for a slot before the request is rejected
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "60"))
+# Worker threads for /analyze and /analyze/batch pipelines, separate from the
+# shared threadpool so analyses waiting on the LLM can't starve other endpoints
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "16"))
+# Peer addresses (e.g. your reverse proxy) whose X-Client-Id header is trusted
+# for fair LLM queuing; other callers are identified by their address
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+# Adaptive quality tiers for /analyze: under load, requests step down from
+# "full" through sampled_profile, low_dpi_charts, no_summary, reports_on_demand
+# and profile_only. A request gets the higher of two tiers: tier N once the
+# analyses in flight (itself included) reach the Nth queue threshold, and a
+# latency tier stepped up or down whenever the p95 of the last
+# QUALITY_LATENCY_WINDOW analyses is above or well below
+# QUALITY_LATENCY_TARGET_MS (0 disables). Latencies older than
+# QUALITY_RECOVERY_S drop out of the window, and the latency tier steps back
+# down once per QUALITY_RECOVERY_S without a slow window (e.g. while idle)
+QUALITY_TIERS_ENABLED = os.getenv("QUALITY_TIERS_ENABLED", "true").lower() in ("1", "true", "yes")
+QUALITY_QUEUE_THRESHOLDS = [int(n) for n in os.getenv("QUALITY_QUEUE_THRESHOLDS", "4,8,12,16,24").split(",") if n.strip()]
+QUALITY_LATENCY_TARGET_MS = float(os.getenv("QUALITY_LATENCY_TARGET_MS", "20000"))
+QUALITY_LATENCY_WINDOW = int(os.getenv("QUALITY_LATENCY_WINDOW", "10"))
+QUALITY_RECOVERY_S = float(os.getenv("QUALITY_RECOVERY_S", "30"))
+# Rows profiled by the sampled_profile tier and chart resolution from low_dpi_charts on
+PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", "20000"))
+LOW_CHART_DPI = int(os.getenv("LOW_CHART_DPI", "72"))
 
 # API Configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable is required")
-
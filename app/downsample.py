@@ -0,0 +1,239 @@
+"""Data reduction for chart rendering on large datasets."""
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import numpy as np
+from matplotlib.axes import Axes
+
+# Colour arrays with at most this many distinct values are treated as categories for stratification
+MAX_STRATA = 50
+
+
+def uniform_sample(n: int, budget: int) -> np.ndarray:
+    """Return sorted positions of a uniform random subset of at most budget rows."""
+    if n <= budget:
+        return np.arange(n)
+    rng = np.random.default_rng(0)  # Deterministic so re-renders are identical
+    return np.sort(rng.choice(n, size=budget, replace=False))
+
+
+def stratified_sample(labels: np.ndarray, budget: int) -> np.ndarray:
+    """
+    Sample at most budget positions, allocating the budget proportionally per label.
+
+    Every label keeps at least one point, so rare categories stay visible.
+
+    Args:
+        labels: Per-row category labels
+        budget: Maximum number of positions to return
+
+    Returns:
+        Sorted array of row positions
+    """
+    n = len(labels)
+    if n <= budget:
+        return np.arange(n)
+    rng = np.random.default_rng(0)
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    quotas = np.maximum(1, np.floor(counts / n * budget)).astype(int)
+    order = np.argsort(inverse, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    picked = []
+    for start, count, quota in zip(starts, counts, quotas):
+        members = order[start:start + count]
+        picked.append(members if quota >= count else rng.choice(members, size=quota, replace=False))
+    return np.sort(np.concatenate(picked))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+
+    Keeps the points that preserve the visual shape of the line, including peaks.
+
+    Args:
+        x: Sorted numeric x values
+        y: Numeric y values
+        n_out: Number of points to keep (at least 3)
+
+    Returns:
+        Sorted array of selected positions
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def prebin(values: np.ndarray, bins=10, value_range=None):
+    """Bin values with np.histogram, ignoring NaNs. Returns (counts, edges)."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    return np.histogram(values, bins=bins, range=value_range)
+
+
+def _as_1d(values) -> Optional[np.ndarray]:
+    """Convert array-like input to a 1-D numpy array, or None if it isn't one."""
+    if values is None or isinstance(values, (str, bytes)) or np.isscalar(values):
+        return None
+    array = np.asarray(values)
+    return array if array.ndim == 1 else None
+
+
+def numeric_positions(values: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Return values as floats for distance computations, or None if not numeric.
+
+    Strings are never converted, even when they look like numbers or dates:
+    matplotlib draws them on a category axis, so their positions aren't the values.
+    """
+    kind = values.dtype.kind
+    if kind == 'M':
+        return values.astype('datetime64[ns]').view('i8').astype(float)
+    if kind == 'O' and any(isinstance(value, (str, bytes)) for value in values):
+        return None
+    if kind not in 'biufO':
+        return None
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        return None
+
+
+def _take(value, n: int, idx: np.ndarray):
+    """Subset per-point style arguments (sizes, colours) alongside the data."""
+    array = _as_1d(value)
+    if array is not None and len(array) == n:
+        return array[idx]
+    return value
+
+
+# Budget of the reduced_plotting block active on each thread (None outside one)
+_active = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _budget() -> Optional[int]:
+    """Point budget of the calling thread's reduced_plotting block, if any."""
+    return getattr(_active, 'budget', None)
+
+
+def _reduce_scatter(budget: int, x, y, s, c):
+    """Sample scatter points (and per-point sizes/colours) down to budget."""
+    xs, ys = _as_1d(x), _as_1d(y)
+    if xs is None or ys is None or len(xs) != len(ys) or len(xs) <= budget:
+        return x, y, s, c
+    n = len(xs)
+    labels = _as_1d(c)
+    if labels is not None and len(labels) == n and len(np.unique(labels)) <= MAX_STRATA:
+        idx = stratified_sample(labels, budget)
+    else:
+        idx = uniform_sample(n, budget)
+    return xs[idx], ys[idx], _take(s, n, idx), _take(c, n, idx)
+
+
+def _reduce_plot(budget: int, args: tuple) -> tuple:
+    """Reduce the positional arguments of an Axes.plot call to budget points."""
+    data = [arg for arg in args if not isinstance(arg, str)]
+    fmt = [arg for arg in args if isinstance(arg, str)]
+    if not (1 <= len(data) <= 2 and len(fmt) <= 1 and (not fmt or args[-1] is fmt[0])):
+        return args
+    ys = _as_1d(data[-1])
+    xs = _as_1d(data[0]) if len(data) == 2 else (np.arange(len(ys)) if ys is not None else None)
+    if xs is None or ys is None or not len(xs) == len(ys) > budget:
+        return args
+    x_num, y_num = numeric_positions(xs), numeric_positions(ys)
+    if x_num is not None and y_num is not None and np.all(np.diff(x_num) >= 0):
+        idx = lttb(x_num, y_num, budget)
+    elif x_num is None:
+        # Category axis: positions follow the labels, so sample rows instead of
+        # picking points along the line (every label survives when there are few)
+        if len(np.unique(xs.astype(str))) <= MAX_STRATA:
+            idx = stratified_sample(xs.astype(str), budget)
+        else:
+            idx = uniform_sample(len(xs), budget)
+    else:
+        return args
+    return (xs[idx], ys[idx], *fmt)
+
+
+def _install():
+    """Wrap Axes.scatter/plot/hist once; the wrappers only reduce inside reduced_plotting."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        original_scatter = Axes.scatter
+        original_plot = Axes.plot
+        original_hist = Axes.hist
+
+        def scatter(self, x, y, s=None, c=None, *args, **kwargs):
+            budget = _budget()
+            if budget is not None:
+                x, y, s, c = _reduce_scatter(budget, x, y, s, c)
+            return original_scatter(self, x, y, s, c, *args, **kwargs)
+
+        def plot(self, *args, **kwargs):
+            budget = _budget()
+            if budget is not None:
+                args = _reduce_plot(budget, args)
+            return original_plot(self, *args, **kwargs)
+
+        def hist(self, x, bins=None, range=None, *args, **kwargs):
+            budget = _budget()
+            values = _as_1d(x) if budget is not None else None
+            if values is not None and len(values) > budget and kwargs.get('weights') is None:
+                numeric = None if np.issubdtype(values.dtype, np.datetime64) else numeric_positions(values)
+                if numeric is not None:
+                    counts, edges = prebin(numeric, bins if bins is not None else 10, range)
+                    kwargs['weights'] = counts
+                    return original_hist(self, edges[:-1], edges, *args, **kwargs)
+            return original_hist(self, x, bins, range, *args, **kwargs)
+
+        Axes.scatter, Axes.plot, Axes.hist = scatter, plot, hist
+        _installed = True
+
+
+@contextmanager
+def reduced_plotting(budget: int):
+    """
+    Reduce data at draw time for matplotlib calls made inside the block.
+
+    Axes.scatter is sampled (stratified by colour labels when present),
+    Axes.plot uses LTTB on monotonic numeric or datetime series and row
+    sampling on category axes, and Axes.hist is pre-binned with np.histogram,
+    so the chart looks the same while render time and PNG size stay bounded
+    by budget. Patching Axes covers pyplot, the object-oriented API and
+    pandas' DataFrame.plot alike.
+
+    The Axes wrappers are installed once for the process and look up the
+    budget of the calling thread, so only plots drawn by this thread inside
+    the block are reduced; blocks may be nested and run on several threads.
+    """
+    _install()
+    previous = _budget()
+    _active.budget = budget
+    try:
+        yield
+    finally:
+        _active.budget = previous
@@ -1,8 +1,305 @@
 """Report formatting module for Markdown and HTML."""
-import base64
+import hashlib
 import os
-from typing import List
-from app.schemas import Report, Insight, DatasetProfile
+from html import escape
+from functools import cached_property
+from string import Template
+from typing import Dict, List, Optional, Tuple
+from app.schemas import Report, Insight, DatasetProfile, ChartAsset
+from app.metrics import record_cache
+
+# Stylesheet for HTML reports; inlined by default or served once and linked by URL
+REPORT_CSS = """\
+body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+    line-height: 1.6;
+    color: #333;
+    max-width: 1200px;
+    margin: 0 auto;
+    padding: 20px;
+    background-color: #f6f7f8;
+}
+h1 {
+    color: #137fec;
+    border-bottom: 3px solid #137fec;
+    padding-bottom: 10px;
+}
+h2 {
+    color: #2c3e50;
+    margin-top: 30px;
+}
+h3 {
+    color: #34495e;
+}
+table {
+    width: 100%;
+    border-collapse: collapse;
+    margin: 20px 0;
+    background: white;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+}
+th, td {
+    padding: 12px;
+    text-align: left;
+    border-bottom: 1px solid #ddd;
+}
+th {
+    background-color: #137fec;
+    color: white;
+    font-weight: bold;
+}
+tr:hover {
+    background-color: #f5f5f5;
+}
+.insight-card {
+    background: white;
+    padding: 20px;
+    margin: 20px 0;
+    border-radius: 8px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+}
+.insight-card h3 {
+    color: #137fec;
+    margin-top: 0;
+}
+.chart-container {
+    margin: 20px 0;
+    text-align: center;
+}
+.chart-container img {
+    max-width: 100%;
+    height: auto;
+    border-radius: 8px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+}
+.summary {
+    background: white;
+    padding: 20px;
+    margin: 20px 0;
+    border-radius: 8px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    border-left: 4px solid #137fec;
+}
+.stats {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+    gap: 20px;
+    margin: 20px 0;
+}
+.stat-card {
+    background: white;
+    padding: 20px;
+    border-radius: 8px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    text-align: center;
+}
+.stat-card h3 {
+    margin: 0;
+    font-size: 2em;
+    color: #137fec;
+}
+.stat-card p {
+    margin: 10px 0 0 0;
+    color: #666;
+}
+"""
+
+# Templates are compiled once at import instead of rebuilt for every report
+_HTML_DOCUMENT = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Dataset Analysis Report</title>
+    $stylesheet
+</head>
+<body>
+$body
+</body></html>""")
+_INLINE_STYLESHEET = f"<style>\n{REPORT_CSS}</style>"
+_LINKED_STYLESHEET = Template("<link rel='stylesheet' href='$url' />")
+_STAT_CARD = Template("<div class='stat-card'><h3>$value</h3><p>$label</p></div>")
+_HTML_COLUMN_ROW = Template("<tr><td>$name</td><td>$dtype</td><td>$nulls</td><td>$unique</td></tr>")
+_HTML_INSIGHT = Template("""<div class='insight-card'>
+<h3>$number. $title</h3>
+<p><strong>Description:</strong> $description</p>
+<p><strong>Rationale:</strong> $rationale</p>$chart
+</div>""")
+_HTML_CHART = Template("\n<div class='chart-container'><img src='$src' alt='Chart $number' /></div>")
+_MD_COLUMN_ROW = Template("| $name | $dtype | $nulls | $unique |")
+
+
+def encode_chart_asset(chart_path: Optional[str]) -> Optional[ChartAsset]:
+    """
+    Read a chart PNG once and hash it for every consumer.
+    
+    Args:
+        chart_path: Path to the chart file (may be None)
+        
+    Returns:
+        ChartAsset with PNG bytes and content hash, or None if the file is missing
+    """
+    if not chart_path or not os.path.exists(chart_path):
+        return None
+    with open(chart_path, 'rb') as f:
+        data = f.read()
+    return ChartAsset(
+        path=chart_path,
+        png=data,
+        digest=hashlib.sha256(data).hexdigest(),
+    )
+
+
+def _column_rows(profile: DatasetProfile) -> List[Dict[str, str]]:
+    """Column table values shared by the Markdown and HTML reports."""
+    rows = []
+    for col in profile.columns:
+        null_count = profile.null_counts.get(col, 0)
+        null_pct = (null_count / profile.n_rows * 100) if profile.n_rows > 0 else 0
+        rows.append({
+            'name': col,
+            'dtype': "Numeric" if profile.dtypes[col] == "numeric" else "Categorical",
+            'nulls': f"{null_count} ({null_pct:.1f}%)",
+            'unique': ("≥" if profile.sampled_rows is not None else "") + str(profile.unique_counts.get(col, 0)),
+        })
+    return rows
+
+
+class ReportRenderer:
+    """
+    Builds Markdown and HTML reports from pre-encoded chart assets.
+    
+    Each format is rendered on first access and cached, so a request that
+    never asks for a report never pays for it.
+    """
+
+    def __init__(
+        self,
+        profile: DatasetProfile,
+        insights: List[Insight],
+        summary: str,
+        charts: List[Optional[ChartAsset]]
+    ):
+        self.profile = profile
+        self.insights = insights
+        self.summary = summary
+        self.charts = charts
+        self._html_cache: Dict[Tuple[Optional[str], Optional[str]], str] = {}
+
+    def _chart(self, index: int) -> Optional[ChartAsset]:
+        return self.charts[index] if index < len(self.charts) else None
+
+    @cached_property
+    def markdown(self) -> str:
+        """Markdown report with charts referenced by file name."""
+        profile = self.profile
+        missing_total = sum(profile.null_counts.values())
+        cells = profile.n_rows * profile.n_cols
+        missing_pct = (missing_total / cells * 100) if cells > 0 else 0
+        
+        md = []
+        md.append("# Dataset Analysis Report\n")
+        md.append("## Dataset Overview\n")
+        md.append(f"- **Total Rows:** {profile.n_rows:,}")
+        md.append(f"- **Total Columns:** {profile.n_cols}")
+        md.append(f"- **Missing Values:** {missing_total:,} ({missing_pct:.2f}%)\n")
+        if profile.sampling_note:
+            md.append(f"> {profile.sampling_note}\n")
+        
+        md.append("### Column Information\n")
+        md.append("| Column Name | Data Type | Missing Values | Unique Values |")
+        md.append("|-------------|-----------|----------------|--------------|")
+        md.extend(_MD_COLUMN_ROW.substitute(row) for row in _column_rows(profile))
+        
+        md.append("\n## Key Insights\n")
+        
+        for i, insight in enumerate(self.insights):
+            md.append(f"### {i+1}. {insight.title}\n")
+            md.append(f"**Description:** {insight.description}\n")
+            md.append(f"**Rationale:** {insight.rationale}\n")
+            asset = self._chart(i)
+            if asset:
+                md.append(f"![Chart {i+1}]({os.path.basename(asset.path)})\n")
+            md.append("---\n")
+        
+        md.append("\n## Executive Summary\n")
+        md.append(f"{self.summary}\n")
+        
+        return "\n".join(md)
+
+    def html(self, chart_url: Optional[str] = None, stylesheet_url: Optional[str] = None) -> str:
+        """
+        HTML report, cached per combination of arguments.
+        
+        Args:
+            chart_url: Format string for chart sources, with {index} and {digest}
+                placeholders; charts are inlined as data URIs when omitted
+            stylesheet_url: URL of REPORT_CSS; the stylesheet is inlined when omitted
+            
+        Returns:
+            HTML report string
+        """
+        key = (chart_url, stylesheet_url)
+        hit = key in self._html_cache
+        record_cache("html_report", hit)
+        if not hit:
+            self._html_cache[key] = self._render_html(chart_url, stylesheet_url)
+        return self._html_cache[key]
+
+    def _render_html(self, chart_url: Optional[str], stylesheet_url: Optional[str]) -> str:
+        profile = self.profile
+        missing_total = sum(profile.null_counts.values())
+        cells = profile.n_rows * profile.n_cols
+        missing_pct = (missing_total / cells * 100) if cells > 0 else 0
+        
+        html = []
+        html.append("<h1>Dataset Analysis Report</h1>")
+        
+        html.append("<div class='stats'>")
+        html.append(_STAT_CARD.substitute(value=f"{profile.n_rows:,}", label="Total Rows"))
+        html.append(_STAT_CARD.substitute(value=profile.n_cols, label="Total Columns"))
+        html.append(_STAT_CARD.substitute(value=f"{missing_pct:.1f}%", label="Missing Values"))
+        html.append("</div>")
+        
+        html.append("<h2>Dataset Overview</h2>")
+        html.append("<table>")
+        html.append("<tr><th>Column Name</th><th>Data Type</th><th>Missing Values</th><th>Unique Values</th></tr>")
+        # Column names, insights and the summary come from the upload and the
+        # LLM, so every substituted value is escaped
+        html.extend(
+            _HTML_COLUMN_ROW.substitute({key: escape(value) for key, value in row.items()})
+            for row in _column_rows(profile)
+        )
+        html.append("</table>")
+        if profile.sampling_note:
+            html.append(f"<p><em>{escape(profile.sampling_note)}</em></p>")
+        
+        html.append("<h2>Key Insights</h2>")
+        
+        for i, insight in enumerate(self.insights):
+            asset = self._chart(i)
+            chart = ""
+            if asset:
+                src = chart_url.format(index=i, digest=asset.digest) if chart_url else asset.data_uri
+                chart = _HTML_CHART.substitute(src=escape(src), number=i + 1)
+            html.append(_HTML_INSIGHT.substitute(
+                number=i + 1,
+                title=escape(insight.title),
+                description=escape(insight.description),
+                rationale=escape(insight.rationale),
+                chart=chart,
+            ))
+        
+        html.append("<div class='summary'>")
+        html.append("<h2>Executive Summary</h2>")
+        html.append(f"<p>{escape(self.summary)}</p>")
+        html.append("</div>")
+        
+        if stylesheet_url:
+            stylesheet = _LINKED_STYLESHEET.substitute(url=escape(stylesheet_url))
+        else:
+            stylesheet = _INLINE_STYLESHEET
+        return _HTML_DOCUMENT.substitute(stylesheet=stylesheet, body="\n".join(html))
 
 
 def format_markdown_report(
@@ -23,39 +320,8 @@ def format_markdown_report(
     Returns:
         Markdown report string
     """
-    md = []
-    md.append("# Dataset Analysis Report\n")
-    md.append(f"## Dataset Overview\n")
-    md.append(f"- **Total Rows:** {profile.n_rows:,}")
-    md.append(f"- **Total Columns:** {profile.n_cols}")
-    md.append(f"- **Missing Values:** {sum(profile.null_counts.values()):,} ({sum(profile.null_counts.values()) / (profile.n_rows * profile.n_cols) * 100:.2f}%)\n")
-    
-    md.append("### Column Information\n")
-    md.append("| Column Name | Data Type | Missing Values | Unique Values |")
-    md.append("|-------------|-----------|----------------|--------------|")
-    
-    for col in profile.columns:
-        dtype_label = "Numeric" if profile.dtypes[col] == "numeric" else "Categorical"
-        null_count = profile.null_counts.get(col, 0)
-        null_pct = (null_count / profile.n_rows * 100) if profile.n_rows > 0 else 0
-        unique_count = profile.unique_counts.get(col, 0)
-        md.append(f"| {col} | {dtype_label} | {null_count} ({null_pct:.1f}%) | {unique_count} |")
-    
-    md.append("\n## Key Insights\n")
-    
-    for i, insight in enumerate(insights):
-        md.append(f"### {i+1}. {insight.title}\n")
-        md.append(f"**Description:** {insight.description}\n")
-        md.append(f"**Rationale:** {insight.rationale}\n")
-        if chart_paths and i < len(chart_paths) and chart_paths[i]:
-            chart_name = os.path.basename(chart_paths[i])
-            md.append(f"![Chart {i+1}]({chart_name})\n")
-        md.append("---\n")
-    
-    md.append("\n## Executive Summary\n")
-    md.append(f"{summary}\n")
-    
-    return "\n".join(md)
+    charts = [encode_chart_asset(path) for path in chart_paths or []]
+    return ReportRenderer(profile, insights, summary, charts).markdown
 
 
 def format_html_report(
@@ -76,168 +342,17 @@ def format_html_report(
     Returns:
         HTML report string
     """
-    # Convert charts to base64 for embedding
-    chart_data_uris = []
-    for chart_path in chart_paths:
-        if chart_path and os.path.exists(chart_path):
-            with open(chart_path, 'rb') as f:
-                chart_data = base64.b64encode(f.read()).decode('utf-8')
-                chart_data_uris.append(f"data:image/png;base64,{chart_data}")
-        else:
-            chart_data_uris.append(None)
-    
-    html = []
-    html.append("""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Dataset Analysis Report</title>
-    <style>
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f6f7f8;
-        }
-        h1 {
-            color: #137fec;
-            border-bottom: 3px solid #137fec;
-            padding-bottom: 10px;
-        }
-        h2 {
-            color: #2c3e50;
-            margin-top: 30px;
-        }
-        h3 {
-            color: #34495e;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-            background: white;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-        th, td {
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #ddd;
-        }
-        th {
-            background-color: #137fec;
-            color: white;
-            font-weight: bold;
-        }
-        tr:hover {
-            background-color: #f5f5f5;
-        }
-        .insight-card {
-            background: white;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-        .insight-card h3 {
-            color: #137fec;
-            margin-top: 0;
-        }
-        .chart-container {
-            margin: 20px 0;
-            text-align: center;
-        }
-        .chart-container img {
-            max-width: 100%;
-            height: auto;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }
-        .summary {
-            background: white;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            border-left: 4px solid #137fec;
-        }
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin: 20px 0;
-        }
-        .stat-card {
-            background: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            text-align: center;
-        }
-        .stat-card h3 {
-            margin: 0;
-            font-size: 2em;
-            color: #137fec;
-        }
-        .stat-card p {
-            margin: 10px 0 0 0;
-            color: #666;
-        }
-    </style>
-</head>
-<body>""")
-    
-    html.append("<h1>Dataset Analysis Report</h1>")
-    
-    html.append("<div class='stats'>")
-    html.append(f"<div class='stat-card'><h3>{profile.n_rows:,}</h3><p>Total Rows</p></div>")
-    html.append(f"<div class='stat-card'><h3>{profile.n_cols}</h3><p>Total Columns</p></div>")
-    missing_total = sum(profile.null_counts.values())
-    missing_pct = (missing_total / (profile.n_rows * profile.n_cols) * 100) if profile.n_rows * profile.n_cols > 0 else 0
-    html.append(f"<div class='stat-card'><h3>{missing_pct:.1f}%</h3><p>Missing Values</p></div>")
-    html.append("</div>")
-    
-    html.append("<h2>Dataset Overview</h2>")
-    html.append("<table>")
-    html.append("<tr><th>Column Name</th><th>Data Type</th><th>Missing Values</th><th>Unique Values</th></tr>")
-    
-    for col in profile.columns:
-        dtype_label = "Numeric" if profile.dtypes[col] == "numeric" else "Categorical"
-        null_count = profile.null_counts.get(col, 0)
-        null_pct = (null_count / profile.n_rows * 100) if profile.n_rows > 0 else 0
-        unique_count = profile.unique_counts.get(col, 0)
-        html.append(f"<tr><td>{col}</td><td>{dtype_label}</td><td>{null_count} ({null_pct:.1f}%)</td><td>{unique_count}</td></tr>")
-    
-    html.append("</table>")
-    
-    html.append("<h2>Key Insights</h2>")
-    
-    for i, insight in enumerate(insights):
-        html.append("<div class='insight-card'>")
-        html.append(f"<h3>{i+1}. {insight.title}</h3>")
-        html.append(f"<p><strong>Description:</strong> {insight.description}</p>")
-        html.append(f"<p><strong>Rationale:</strong> {insight.rationale}</p>")
-        if chart_data_uris and i < len(chart_data_uris) and chart_data_uris[i]:
-            html.append(f"<div class='chart-container'><img src='{chart_data_uris[i]}' alt='Chart {i+1}' /></div>")
-        html.append("</div>")
-    
-    html.append("<div class='summary'>")
-    html.append("<h2>Executive Summary</h2>")
-    html.append(f"<p>{summary}</p>")
-    html.append("</div>")
-    
-    html.append("</body></html>")
-    
-    return "\n".join(html)
+    charts = [encode_chart_asset(path) for path in chart_paths or []]
+    return ReportRenderer(profile, insights, summary, charts).html()
 
 
 def generate_reports(profile: DatasetProfile, insights: List[Insight], summary: str, chart_paths: List[str]) -> tuple[str, str]:
     """
     Generate both Markdown and HTML reports.
     
+    Charts are read and encoded once and shared by both formats. Callers that
+    already hold ChartAssets should use ReportRenderer directly.
+    
     Args:
         profile: DatasetProfile object
         insights: List of Insight objects
@@ -247,7 +362,6 @@ def generate_reports(profile: DatasetProfile, insights: List[Insight], summary:
     Returns:
         Tuple of (markdown_report, html_report)
     """
-    md_report = format_markdown_report(profile, insights, summary, chart_paths)
-    html_report = format_html_report(profile, insights, summary, chart_paths)
-    return md_report, html_report
-
+    charts = [encode_chart_asset(path) for path in chart_paths or []]
+    renderer = ReportRenderer(profile, insights, summary, charts)
+    return renderer.markdown, renderer.html()
@@ -0,0 +1,289 @@
+"""Process-wide scheduling of LLM calls: rate limits, priorities, fairness and single-flight."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, Optional
+from app.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT_S,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+)
+from app.metrics import (
+    LLM_COALESCED,
+    LLM_QUEUE_SECONDS,
+    LLM_QUEUE_TIMEOUTS,
+    QUEUE_DEPTH,
+    llm_call,
+    record_llm_usage,
+)
+
+# Priority classes, highest first; a batch call only starts when no interactive call is waiting
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# Completion tokens reserved per call until the response reports actual usage
+ESTIMATED_COMPLETION_TOKENS = 1024
+
+
+class LLMQueueTimeout(RuntimeError):
+    """Raised when a call waited LLM_QUEUE_TIMEOUT_S without being scheduled."""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding up to one minute's worth.
+
+    A rate of 0 disables the limit. Not thread-safe; LLMScheduler guards it.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 when it can be taken now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        # A single call larger than the bucket waits for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if self.enabled:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) tokens once actual usage is known."""
+        if self.enabled:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    """A call waiting for a slot; granted is set once it may start."""
+    __slots__ = ("client", "priority", "tokens", "granted", "queued")
+
+    def __init__(self, client: str, priority: str, tokens: int):
+        self.client = client
+        self.priority = priority
+        self.tokens = tokens
+        self.granted = threading.Event()
+        self.queued = False
+
+
+class _Flight:
+    """A call in progress, shared by the callers coalesced onto it."""
+    __slots__ = ("future", "ticket")
+
+    def __init__(self, ticket: _Ticket):
+        self.future = Future()
+        self.ticket = ticket
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls under request/token rate limits and a concurrency cap.
+
+    Waiting calls are served strictly by priority class and round-robin
+    across clients within a class, so one client's large batch can't starve
+    another's. Identical prompts already in flight are coalesced: later
+    callers wait (at most queue_timeout) for the first call and share its
+    response, and a waiting call is promoted to the highest priority among
+    its callers.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_S
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._timer: Optional[threading.Timer] = None
+        # priority -> client -> waiting tickets; client order is the round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+
+    def submit(
+        self,
+        call: str,
+        func: Callable,
+        prompt: str,
+        priority: str = INTERACTIVE,
+        client: str = "anonymous"
+    ):
+        """
+        Run func (an LLM invocation for prompt) once it is scheduled and return its response.
+
+        Args:
+            call: Call name used for metrics ("insights", "summary")
+            func: Zero-argument callable performing the request
+            prompt: Full prompt text, used as the coalescing key and token estimate
+            priority: INTERACTIVE or BATCH
+            client: Identity used for fair queuing
+
+        Returns:
+            The LangChain response (shared with coalesced callers)
+
+        Raises:
+            LLMQueueTimeout: If no slot was granted within the queue timeout,
+                or a coalesced call didn't finish within it
+        """
+        key = hashlib.sha256(f"{call}\0{prompt}".encode("utf-8")).hexdigest()
+        ticket = _Ticket(client, priority, len(prompt) // 4 + ESTIMATED_COMPLETION_TOKENS)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(ticket)
+        if not leader:
+            LLM_COALESCED.labels(call=call).inc()
+            self._promote(flight.ticket, priority)
+            try:
+                return flight.future.result(timeout=self.queue_timeout)
+            except FutureTimeout:
+                LLM_QUEUE_TIMEOUTS.labels(priority=priority).inc()
+                raise LLMQueueTimeout(
+                    f"Coalesced LLM call not finished within {self.queue_timeout:g}s; the service is over capacity"
+                ) from None
+
+        try:
+            response = self._run(call, func, ticket)
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(response)
+            return response
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+
+    def _run(self, call: str, func: Callable, ticket: _Ticket):
+        self._acquire(ticket)
+        try:
+            with llm_call(call):
+                response = func()
+            record_llm_usage(call, response)
+            usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+            actual = usage.get("total_tokens")
+            if actual:
+                with self._lock:
+                    self._tokens.adjust(ticket.tokens - actual)
+            return response
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._dispatch()
+
+    def _acquire(self, ticket: _Ticket):
+        """Block until the dispatcher grants ticket a slot."""
+        start = time.monotonic()
+        with self._lock:
+            self._enqueue(ticket)
+            self._dispatch()
+        if not ticket.granted.wait(self.queue_timeout):
+            with self._lock:
+                # Granted between the timeout and taking the lock
+                if not ticket.granted.is_set():
+                    self._dequeue(ticket)
+                    LLM_QUEUE_TIMEOUTS.labels(priority=ticket.priority).inc()
+                    raise LLMQueueTimeout(
+                        f"LLM call not scheduled within {self.queue_timeout:g}s; the service is over capacity"
+                    )
+        LLM_QUEUE_SECONDS.labels(priority=ticket.priority).observe(time.monotonic() - start)
+
+    def _promote(self, ticket: _Ticket, priority: str):
+        """Move a waiting ticket up to priority if that class is higher than its own."""
+        with self._lock:
+            if ticket.granted.is_set() or PRIORITIES.index(priority) >= PRIORITIES.index(ticket.priority):
+                return
+            if not ticket.queued:
+                # Not enqueued yet; it will be at the new priority
+                ticket.priority = priority
+                return
+            self._dequeue(ticket)
+            ticket.priority = priority
+            self._enqueue(ticket)
+            self._dispatch()
+
+    def _dispatch(self):
+        """
+        Start waiting tickets in queue order while capacity allows (caller holds the lock).
+
+        Only granted tickets are woken. When the head is held back by a rate
+        limit, a timer retries once the bucket has refilled.
+        """
+        while self._in_flight < self.max_concurrency:
+            head = self._head()
+            if head is None:
+                return
+            wait = max(self._requests.wait_time(1), self._tokens.wait_time(head.tokens))
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            self._requests.take(1)
+            self._tokens.take(head.tokens)
+            self._dequeue(head, served=True)
+            self._in_flight += 1
+            head.granted.set()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _enqueue(self, ticket: _Ticket):
+        clients = self._queues[ticket.priority]
+        clients.setdefault(ticket.client, deque()).append(ticket)
+        ticket.queued = True
+        QUEUE_DEPTH.labels(queue=f"llm_{ticket.priority}").inc()
+
+    def _dequeue(self, ticket: _Ticket, served: bool = False):
+        clients = self._queues[ticket.priority]
+        tickets = clients[ticket.client]
+        tickets.remove(ticket)
+        ticket.queued = False
+        if served:
+            # This client's turn is over; the next one goes to the back of the round
+            clients.move_to_end(ticket.client)
+        if not tickets:
+            del clients[ticket.client]
+        QUEUE_DEPTH.labels(queue=f"llm_{ticket.priority}").dec()
+
+    def _head(self) -> Optional[_Ticket]:
+        """The next ticket to run: highest priority class, then the client whose turn it is."""
+        for priority in PRIORITIES:
+            clients = self._queues[priority]
+            if clients:
+                return next(iter(clients.values()))[0]
+        return None
+
+
+llm_scheduler = LLMScheduler()
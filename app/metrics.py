@@ -0,0 +1,123 @@
+"""Pipeline instrumentation exported as Prometheus metrics and Server-Timing headers."""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from prometheus_client import Counter, Gauge, Histogram
+
+# Buckets spanning fast in-process stages up to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "csv_insight_stage_seconds", "Time spent in each analysis pipeline stage", ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "csv_insight_request_seconds", "End-to-end HTTP request latency", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "csv_insight_llm_seconds", "Latency of LLM calls", ["call"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "csv_insight_llm_tokens_total", "Tokens consumed by LLM calls", ["call", "kind"],
+)
+LLM_ERRORS = Counter(
+    "csv_insight_llm_errors_total", "LLM calls that raised", ["call"],
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "csv_insight_llm_queue_seconds", "Time LLM calls waited for the scheduler", ["priority"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_COALESCED = Counter(
+    "csv_insight_llm_coalesced_total", "LLM calls answered by an identical call already in flight", ["call"],
+)
+LLM_QUEUE_TIMEOUTS = Counter(
+    "csv_insight_llm_queue_timeouts_total", "LLM calls rejected after waiting too long for a slot", ["priority"],
+)
+QUALITY_TIER = Counter(
+    "csv_insight_quality_tier_total", "Analyses served at each quality tier", ["tier"],
+)
+CHART_SECONDS = Histogram(
+    "csv_insight_chart_render_seconds", "Chart render time by rendering path", ["path"],
+    buckets=LATENCY_BUCKETS,
+)
+CHARTS = Counter(
+    "csv_insight_charts_total", "Chart render attempts by rendering path and outcome", ["path", "outcome"],
+)
+CACHE_REQUESTS = Counter(
+    "csv_insight_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"],
+)
+IN_FLIGHT = Gauge(
+    "csv_insight_requests_in_flight", "HTTP requests currently being handled",
+)
+QUEUE_DEPTH = Gauge(
+    "csv_insight_queue_depth", "Work items waiting in internal queues", ["queue"],
+)
+
+# Per-request (name, milliseconds) spans reported in the Server-Timing header
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Begin collecting Server-Timing spans for the current request."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def _add_timing(name: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds * 1000))
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """Format collected spans as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into STAGE_SECONDS and the request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        _add_timing(name, elapsed)
+
+
+@contextmanager
+def llm_call(call: str):
+    """Time an LLM call into LLM_SECONDS, counting calls that raise."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        LLM_ERRORS.labels(call=call).inc()
+        raise
+    finally:
+        LLM_SECONDS.labels(call=call).observe(time.perf_counter() - start)
+
+
+def record_llm_usage(call: str, response):
+    """Count prompt/completion tokens reported in a LangChain chat response."""
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.labels(call=call, kind=kind).inc(tokens)
+
+
+def record_chart(path: str, seconds: float, success: bool):
+    """Record a chart render attempt on the "index", "spec" or "exec" path."""
+    CHART_SECONDS.labels(path=path).observe(seconds)
+    CHARTS.labels(path=path, outcome="success" if success else "failure").inc()
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup as a hit or miss."""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
@@ -1,9 +1,11 @@
 """CSV profiling and analysis module."""
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.schemas import DatasetProfile
 from app.config import MAX_COLUMNS
+from app.profiling import profiled_stage
+from app.aggregates import AggregateIndex, dataset_cache, file_digest
 
 
 def detect_column_type(series: pd.Series) -> str:
@@ -50,16 +52,35 @@ def calculate_correlations(df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
     return correlations
 
 
-def profile_dataset(file_path: str) -> DatasetProfile:
+@profiled_stage("profile_dataset")
+def profile_dataset(file_path: str, cached: bool = True, sample_rows: Optional[int] = None) -> DatasetProfile:
     """
     Profile a CSV dataset and return structured information.
     
+    The same pass builds the dataset's AggregateIndex for the chart layer;
+    both are kept in dataset_cache under the file's content digest.
+    
+    With sample_rows, statistics, correlations and the index are computed
+    from a uniform sample of that many rows; n_rows stays exact and null
+    counts and the index's counts are scaled to the full dataset, while
+    unique counts only cover the sample; sampled_rows marks such profiles
+    (see DatasetProfile.sampling_note).
+    
     Args:
         file_path: Path to the CSV file
+        cached: Whether to reuse the profile of an identical file profiled earlier
+        sample_rows: Profile at most this many rows (None profiles every row)
         
     Returns:
         DatasetProfile object with dataset information
     """
+    digest = file_digest(file_path)
+    if cached:
+        entry = dataset_cache.get(digest)
+        # A sampled profile only answers requests that accept one
+        if entry is not None and (not entry.sampled or sample_rows is not None):
+            return entry.profile.model_copy(deep=True)
+    
     # Read CSV with error handling
     try:
         df = pd.read_csv(file_path, encoding='utf-8')
@@ -71,16 +92,24 @@ def profile_dataset(file_path: str) -> DatasetProfile:
     if len(df.columns) > MAX_COLUMNS:
         raise ValueError(f"Dataset has {len(df.columns)} columns. Maximum allowed is {MAX_COLUMNS}.")
     
+    n_rows = len(df)
+    sampled = sample_rows is not None and n_rows > sample_rows
+    if sampled:
+        df = df.sample(n=sample_rows, random_state=0).sort_index()
+    scale = n_rows / len(df) if sampled else 1.0
+    
     # Get column information
     columns = df.columns.tolist()
     dtypes = {}
     null_counts = {}
-    unique_counts = {}
     
     for col in columns:
         dtypes[col] = detect_column_type(df[col])
-        null_counts[col] = int(df[col].isna().sum())
-        unique_counts[col] = int(df[col].nunique())
+        null_counts[col] = int(round(df[col].isna().sum() * scale))
+    
+    # Aggregate index for the chart layer; its value counts give the unique counts
+    index = AggregateIndex.build(df, scale=scale)
+    unique_counts = {col: int(index.distinct[col]) for col in columns}
     
     # Calculate summary statistics
     summary_stats = calculate_summary_stats(df)
@@ -88,14 +117,17 @@ def profile_dataset(file_path: str) -> DatasetProfile:
     # Calculate correlations
     correlations = calculate_correlations(df)
     
-    return DatasetProfile(
+    profile = DatasetProfile(
         columns=columns,
         dtypes=dtypes,
         null_counts=null_counts,
         summary_stats=summary_stats,
         correlations=correlations,
-        n_rows=int(len(df)),
+        n_rows=int(n_rows),
         n_cols=int(len(columns)),
-        unique_counts=unique_counts
+        unique_counts=unique_counts,
+        sampled_rows=len(df) if sampled else None
     )
+    dataset_cache.put(digest, profile, index, sampled=sampled)
+    return profile.model_copy(deep=True)
 
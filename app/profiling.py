@@ -0,0 +1,233 @@
+"""Opt-in per-request CPU and memory profiling."""
+import cProfile
+import functools
+import hmac
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from fastapi import Request
+from app.config import (
+    PROFILING_ADMIN_TOKEN,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SAMPLE_INTERVAL_MS,
+    PROFILE_CACHE_SIZE,
+)
+
+# Number of allocation sites reported per session
+TOP_ALLOCATIONS = 25
+
+_active_session: ContextVar[Optional["ProfileSession"]] = ContextVar("active_profile_session", default=None)
+# tracemalloc is process-wide and the sampler costs a thread, so only one request is profiled at a time
+_session_lock = threading.Lock()
+
+
+class ProfileSession:
+    """
+    CPU and allocation profile of one request.
+
+    Combines cProfile (for pstats) and a stack sampler (for flamegraph-ready
+    collapsed stacks), both limited to the thread that runs the profiled work
+    (see run), with tracemalloc for per-stage allocation peaks and top
+    allocation sites when memory is set. tracemalloc slows every allocation
+    in the process several-fold, so it is only used on explicit admin
+    requests; its figures include allocations made by other requests'
+    threads meanwhile.
+    """
+
+    def __init__(self, memory: bool = False):
+        self.id = uuid.uuid4().hex
+        self.memory = memory
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.top_allocations = []
+        self._cpu = cProfile.Profile()
+        self._samples: Counter = Counter()
+        self._thread_id: Optional[int] = None
+        self._stop_sampling = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+
+    @property
+    def finished(self) -> bool:
+        return self._sampler is not None and self._stop_sampling.is_set()
+
+    def run(self, func, *args):
+        """Run func(*args) on the calling thread with the profilers attached to that thread."""
+        token = _active_session.set(self)
+        self.start()
+        try:
+            return func(*args)
+        finally:
+            self.stop()
+            _active_session.reset(token)
+
+    def start(self):
+        """Start profiling the calling thread."""
+        self._thread_id = threading.get_ident()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._start = time.perf_counter()
+        # cProfile only hooks the thread that enables it
+        self._cpu.enable()
+
+    def stop(self):
+        self._cpu.disable()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self._stop_sampling.set()
+        self._sampler.join()
+        if not self.memory:
+            return
+        # Leave out the sampler's own stack strings and tracemalloc internals
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        self.top_allocations = [
+            {"site": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        ]
+
+    def _sample(self):
+        """Record the profiled thread's stack every PROFILING_SAMPLE_INTERVAL_MS."""
+        interval = PROFILING_SAMPLE_INTERVAL_MS / 1000
+        while not self._stop_sampling.wait(interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self._samples[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def track(self, name: str):
+        """Record the duration of a stage, and its allocation peak when tracing memory."""
+        if self.memory:
+            tracemalloc.reset_peak()
+            start_current, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.stages.setdefault(name, {"calls": 0, "total_ms": 0.0})
+            stats["calls"] += 1
+            stats["total_ms"] = round(stats["total_ms"] + (time.perf_counter() - start) * 1000, 3)
+            if self.memory:
+                _, peak = tracemalloc.get_traced_memory()
+                stats["peak_kb"] = max(stats.get("peak_kb", 0.0), round((peak - start_current) / 1024, 1))
+
+    def pstats_bytes(self) -> bytes:
+        """The CPU profile in the binary format read by pstats.Stats / snakeviz."""
+        stats = pstats.Stats(self._cpu)
+        return marshal.dumps(stats.stats)
+
+    def collapsed_stacks(self) -> str:
+        """Sampled stacks in collapsed format (flamegraph.pl, speedscope, inferno)."""
+        return "\n".join(f"{stack} {count}" for stack, count in self._samples.most_common()) + "\n"
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "memory": self.memory,
+            "samples": sum(self._samples.values()),
+            "stages": self.stages,
+            "top_allocations": self.top_allocations,
+        }
+
+
+class ProfileStore:
+    """Bounded LRU of finished profile sessions."""
+
+    def __init__(self, max_profiles: int = PROFILE_CACHE_SIZE):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, ProfileSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: ProfileSession):
+        with self._lock:
+            self._profiles[session.id] = session
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profile_store = ProfileStore()
+
+
+def is_admin(request: Request) -> bool:
+    """
+    Whether the request carries the profiling admin token.
+
+    Only the X-Profile-Token header is accepted; query parameters end up in
+    access logs.
+    """
+    if not PROFILING_ADMIN_TOKEN:
+        return False
+    token = request.headers.get("x-profile-token") or ""
+    return hmac.compare_digest(token, PROFILING_ADMIN_TOKEN)
+
+
+def should_profile(request: Request) -> bool:
+    """Profile when the admin token is presented or the request is sampled."""
+    if is_admin(request):
+        return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+@contextmanager
+def profile_request(request: Request):
+    """
+    Reserve a profile session if the request opted in or was sampled.
+
+    Yields the ProfileSession, or None when profiling is off; in that case
+    nothing is started, so the only cost is the should_profile check. The
+    session profiles nothing by itself: the work to profile is passed to
+    session.run on the thread that executes it, so other requests served by
+    the event loop meanwhile stay out of the profile. Allocation tracing is
+    only enabled for admin requests, not sampled ones.
+    """
+    if not should_profile(request) or not _session_lock.acquire(blocking=False):
+        yield None
+        return
+    session = ProfileSession(memory=is_admin(request))
+    try:
+        yield session
+    finally:
+        if session.finished:
+            profile_store.add(session)
+        _session_lock.release()
+
+
+def profiled_stage(name: str):
+    """Decorator recording a function's allocation peak when its request is profiled."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            session = _active_session.get()
+            if session is None:
+                return func(*args, **kwargs)
+            with session.track(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
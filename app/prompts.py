@@ -56,3 +56,19 @@ Key Insights:
 
 Write the executive summary now:"""
 
+
+
+CHART_SPEC_PROMPT = """
+
+Additionally, for each insight include a "chart_spec" object describing the same chart declaratively, so it can be rendered without running code. Fields:
+- type: one of "scatter", "bar", "histogram", "line"
+- x: column name for the x-axis (for histogram, the numeric column to bin)
+- y: column name for the y-axis (omit for histogram and for bar charts of value counts)
+- aggregation: for bar/line charts, one of "count", "sum", "mean", "median", "min", "max" (omit otherwise)
+- bins: number of bins for histograms (omit otherwise)
+- title: chart title
+- xlabel, ylabel: axis labels (optional; default to the column names)
+
+Example: {{"type": "bar", "x": "region", "y": "sales", "aggregation": "mean", "title": "Average Sales by Region"}}
+
+Still provide chart_code as a fallback. Only use columns that exist in the dataset profile."""
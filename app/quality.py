@@ -0,0 +1,156 @@
+"""Adaptive quality tiers: cheaper analyses while /analyze is under pressure."""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator, List, Tuple
+from app.config import (
+    CHART_DPI,
+    LOW_CHART_DPI,
+    QUALITY_LATENCY_TARGET_MS,
+    QUALITY_LATENCY_WINDOW,
+    QUALITY_QUEUE_THRESHOLDS,
+    QUALITY_RECOVERY_S,
+    QUALITY_TIERS_ENABLED,
+)
+from app.metrics import QUALITY_TIER, QUEUE_DEPTH
+
+# Tiers from full quality to cheapest; each keeps the degradations of the ones before it
+TIERS = ("full", "sampled_profile", "low_dpi_charts", "no_summary", "reports_on_demand", "profile_only")
+
+# A window p95 below this fraction of the latency target steps the latency tier back down
+RECOVERY_FRACTION = 0.5
+
+
+class QualityTier:
+    """One of TIERS and what it means for the pipeline."""
+
+    def __init__(self, level: int):
+        self.level = min(max(level, 0), len(TIERS) - 1)
+
+    @property
+    def name(self) -> str:
+        return TIERS[self.level]
+
+    @property
+    def sampled_profile(self) -> bool:
+        """Profile a row sample (PROFILE_SAMPLE_ROWS) instead of every row."""
+        return self.level >= 1
+
+    @property
+    def chart_dpi(self) -> int:
+        return LOW_CHART_DPI if self.level >= 2 else CHART_DPI
+
+    @property
+    def skip_summary(self) -> bool:
+        """Build the summary from the insights instead of a second LLM call."""
+        return self.level >= 3
+
+    @property
+    def inline_html(self) -> bool:
+        """Whether include_reports may inline the HTML report (it stays available by link)."""
+        return self.level < 4
+
+    @property
+    def profile_only(self) -> bool:
+        """Skip the LLM and charts entirely."""
+        return self.level >= 5
+
+
+class QualityPolicy:
+    """
+    Picks the quality tier of each analysis from live load.
+
+    The depth tier is the number of queue thresholds reached by the analyses
+    in flight (this one included). The latency tier moves one step at a time:
+    up when the p95 of the last latency_window analyses exceeds the target,
+    down when it falls below RECOVERY_FRACTION of it; the window restarts after
+    each step so the effect of the new tier is measured. Latencies older than
+    recovery_s leave the window, and the latency tier also steps down once
+    per recovery_s that passes without a window at or above the recovery
+    level, so a burst doesn't leave an idle service degraded. Requests get
+    the higher of the two.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = QUALITY_TIERS_ENABLED,
+        queue_thresholds: List[int] = QUALITY_QUEUE_THRESHOLDS,
+        latency_target_ms: float = QUALITY_LATENCY_TARGET_MS,
+        latency_window: int = QUALITY_LATENCY_WINDOW,
+        recovery_s: float = QUALITY_RECOVERY_S
+    ):
+        self.enabled = enabled
+        self.queue_thresholds = sorted(queue_thresholds)
+        self.latency_target_ms = latency_target_ms
+        self.recovery_s = recovery_s
+        # (finish time, latency ms) of recent analyses
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=max(latency_window, 1))
+        self._latency_level = 0
+        # When the latency tier last changed or was last confirmed by a slow window
+        self._latency_checked = time.monotonic()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _set_latency_level(self, level: int, now: float):
+        self._latency_level = level
+        self._latency_checked = now
+        self._latencies.clear()
+
+    def _decay(self, now: float):
+        """Step the latency tier down once per quiet recovery_s (caller holds the lock)."""
+        if self._latency_level == 0 or self.recovery_s <= 0:
+            return
+        quiet_periods = int((now - self._latency_checked) // self.recovery_s)
+        if quiet_periods > 0:
+            self._set_latency_level(max(self._latency_level - quiet_periods, 0), now)
+
+    def _tier(self) -> QualityTier:
+        if not self.enabled:
+            return QualityTier(0)
+        self._decay(time.monotonic())
+        depth_level = sum(1 for threshold in self.queue_thresholds if self._in_flight >= threshold)
+        return QualityTier(max(depth_level, self._latency_level))
+
+    @contextmanager
+    def admit(self) -> Iterator[QualityTier]:
+        """Count an analysis as in flight for its duration and yield its tier."""
+        with self._lock:
+            self._in_flight += 1
+            tier = self._tier()
+        QUEUE_DEPTH.labels(queue="analyze").inc()
+        QUALITY_TIER.labels(tier=tier.name).inc()
+        start = time.perf_counter()
+        try:
+            yield tier
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            QUEUE_DEPTH.labels(queue="analyze").dec()
+            with self._lock:
+                self._in_flight -= 1
+                self._observe(elapsed_ms)
+
+    def _observe(self, elapsed_ms: float):
+        """Add a finished analysis to the latency window and step the latency tier (caller holds the lock)."""
+        if not self.enabled or self.latency_target_ms <= 0:
+            return
+        now = time.monotonic()
+        self._decay(now)
+        while self._latencies and self.recovery_s > 0 and now - self._latencies[0][0] > self.recovery_s:
+            self._latencies.popleft()
+        self._latencies.append((now, elapsed_ms))
+        if len(self._latencies) < self._latencies.maxlen:
+            return
+        ordered = sorted(latency for _, latency in self._latencies)
+        p95 = ordered[math.ceil(0.95 * len(ordered)) - 1]
+        if p95 > self.latency_target_ms and self._latency_level < len(TIERS) - 1:
+            self._set_latency_level(self._latency_level + 1, now)
+        elif p95 < self.latency_target_ms * RECOVERY_FRACTION and self._latency_level > 0:
+            self._set_latency_level(self._latency_level - 1, now)
+        elif p95 >= self.latency_target_ms * RECOVERY_FRACTION:
+            # Still slow enough to need the current tier
+            self._latency_checked = now
+
+
+quality_policy = QualityPolicy()
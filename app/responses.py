@@ -0,0 +1,107 @@
+"""Response serialization and content-encoding negotiation."""
+import gzip
+from typing import Any, Dict, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic_core import to_json
+from app.config import COMPRESSION_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Media types whose payloads are already compressed and gain nothing from gzip/brotli
+PRECOMPRESSED_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp", "application/zip", "application/gzip")
+
+
+def encode_json(content: Any) -> bytes:
+    """Serialize content (Pydantic models, dicts, lists) straight to JSON bytes."""
+    return to_json(content)
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content coding to use for a response.
+    
+    Args:
+        accept_encoding: Value of the request's Accept-Encoding header
+        
+    Returns:
+        "br", "gzip" or None for identity
+    """
+    if not accept_encoding:
+        return None
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Compress body with the given content coding ("br", "gzip" or None)."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def negotiated_response(
+    request: Request,
+    body: bytes,
+    media_type: str,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Build a response, compressing body according to the client's Accept-Encoding.
+    
+    Small bodies and already-compressed media types are sent as-is.
+    
+    Args:
+        request: Incoming request
+        body: Encoded response body
+        media_type: Content type of body
+        status_code: HTTP status code
+        headers: Extra response headers
+        
+    Returns:
+        Response with Content-Encoding and Vary set when compressed
+    """
+    headers = dict(headers or {})
+    if len(body) >= COMPRESSION_MIN_BYTES and not media_type.startswith(PRECOMPRESSED_TYPES):
+        headers["Vary"] = "Accept-Encoding"
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def json_response(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize content with encode_json and return it as a negotiated JSON response."""
+    return negotiated_response(request, encode_json(content), "application/json", headers=headers)
@@ -1,6 +1,19 @@
 """Pydantic v2 models for data validation."""
+import base64
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional
+
+
+class ChartSpec(BaseModel):
+    """Declarative chart description rendered natively instead of via exec."""
+    type: Literal["scatter", "bar", "histogram", "line"]
+    x: str
+    y: Optional[str] = None
+    aggregation: Optional[Literal["count", "sum", "mean", "median", "min", "max"]] = None
+    bins: Optional[int] = Field(default=None, ge=1, le=200)
+    title: Optional[str] = None
+    xlabel: Optional[str] = None  # Axis labels default to the column/aggregation names
+    ylabel: Optional[str] = None
 
 
 class DatasetProfile(BaseModel):
@@ -13,6 +26,18 @@ class DatasetProfile(BaseModel):
     n_rows: int
     n_cols: int
     unique_counts: Dict[str, int] = Field(default_factory=dict)
+    sampled_rows: Optional[int] = None  # Rows the statistics came from, when profiled on a sample
+
+    @property
+    def sampling_note(self) -> Optional[str]:
+        """Caveat for profiles computed from a row sample, or None for exact profiles."""
+        if self.sampled_rows is None:
+            return None
+        return (
+            f"Profiled on a uniform sample of {self.sampled_rows:,} of {self.n_rows:,} rows: "
+            "statistics and correlations come from the sample, missing-value counts are "
+            "estimates and unique counts are lower bounds."
+        )
 
 
 class Insight(BaseModel):
@@ -21,16 +46,32 @@ class Insight(BaseModel):
     description: str
     rationale: str
     chart_code: str
-    chart_path: Optional[str] = None
+    chart_spec: Optional[ChartSpec] = None  # Native fast path; chart_code is the fallback
+    chart_path: Optional[str] = None  # URL of the rendered chart under /reports
     confidence: float = Field(ge=0, le=1, default=0.8)
 
 
+class ChartAsset(BaseModel):
+    """A rendered chart, read once and shared by the response, reports and chart endpoint."""
+    path: str
+    png: bytes = Field(repr=False)
+    digest: str  # SHA-256 of the PNG bytes
+
+    @property
+    def data_uri(self) -> str:
+        """The chart as a data:image/png;base64 URI for inline embedding."""
+        return f"data:image/png;base64,{base64.b64encode(self.png).decode('utf-8')}"
+
+
 class Report(BaseModel):
     """Complete analysis report."""
     dataset_overview: str
     insights: List[Insight]
     summary: str
-    charts: List[Optional[str]]  # Chart paths or base64 data (can be None if chart generation fails)
+    charts: List[Optional[str]]  # Chart URLs or base64 data (can be None if chart generation fails)
     markdown_report: Optional[str] = None
     html_report: Optional[str] = None
+    report_id: Optional[str] = None
+    links: Dict[str, str] = Field(default_factory=dict)  # Report resources served on demand
+    quality_tier: str = "full"  # Reduced tiers are served under load (see app.quality)
 
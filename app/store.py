@@ -0,0 +1,49 @@
+"""
+In-memory store of finished reports served by the /reports endpoints.
+
+Reports live in the process that produced them: run the API as a single
+worker process (scale out with replicas behind sticky routing, not uvicorn
+--workers), and expect report links to expire on restart.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+from app.config import REPORT_CACHE_SIZE
+from app.formatter import ReportRenderer
+from app.metrics import record_cache
+
+
+class ReportStore:
+    """
+    Bounded LRU map of report id to ReportRenderer.
+    
+    The renderer holds the encoded chart assets and caches each rendered
+    report format, so charts and reports are produced at most once per id.
+    """
+
+    def __init__(self, max_reports: int = REPORT_CACHE_SIZE):
+        self.max_reports = max_reports
+        self._reports: "OrderedDict[str, ReportRenderer]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, renderer: ReportRenderer) -> str:
+        """Store a renderer and return its new report id."""
+        report_id = uuid.uuid4().hex
+        with self._lock:
+            self._reports[report_id] = renderer
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+        return report_id
+
+    def get(self, report_id: str) -> Optional[ReportRenderer]:
+        """Return the renderer for report_id, or None if unknown or evicted."""
+        with self._lock:
+            renderer = self._reports.get(report_id)
+            if renderer is not None:
+                self._reports.move_to_end(report_id)
+        record_cache("report_store", renderer is not None)
+        return renderer
+
+
+report_store = ReportStore()
@@ -0,0 +1,94 @@
+"""Startup warm-up so new replicas serve their first request at full speed."""
+import io
+import logging
+import threading
+import time
+from typing import Optional
+from app.config import GROQ_API_KEY
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUpState:
+    """Progress of the startup warm-up, reported by the readiness endpoint."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.done.is_set() and self.error is None and bool(GROQ_API_KEY)
+
+    def status(self) -> dict:
+        checks = {
+            "warm_up": "done" if self.done.is_set() else "running",
+            "groq_api_key": "configured" if GROQ_API_KEY else "missing",
+        }
+        if self.error:
+            checks["warm_up"] = f"failed: {self.error}"
+        if self.duration_ms is not None:
+            checks["warm_up_ms"] = round(self.duration_ms, 1)
+        return checks
+
+
+warm_up_state = WarmUpState()
+
+
+def _prime_charts():
+    """Import the chart stack and render one small chart through the Agg backend."""
+    from app.charts import plt, pd, pyplot_lock
+    from app.config import CHART_DPI, CHART_MAX_POINTS
+    from app.downsample import reduced_plotting
+
+    # Draws text (building the font cache), and goes through pandas plotting
+    # and the draw-time reduction layer exactly like exec'd chart code does
+    with pyplot_lock, reduced_plotting(CHART_MAX_POINTS):
+        fig, ax = plt.subplots(figsize=(4, 3))
+        pd.DataFrame({"x": range(10), "y": range(10)}).plot(x="x", y="y", ax=ax, title="warm-up")
+        ax.scatter(range(10), range(10))
+        ax.hist(range(10), bins=5)
+        fig.savefig(io.BytesIO(), format="png", dpi=CHART_DPI, bbox_inches="tight")
+        plt.close(fig)
+
+
+def _prime_llm_client():
+    """Import LangChain/Groq and build the shared client and its connection pool."""
+    from app.agent import create_groq_llm
+    if GROQ_API_KEY:
+        create_groq_llm()
+
+
+def _prime_chart_workers():
+    """Start the batch chart worker processes (spawning them takes seconds)."""
+    try:
+        from app.batch import batch_scheduler
+        batch_scheduler.prime()
+    except Exception as e:
+        logger.warning(f"Chart worker warm-up failed: {e}", exc_info=True)
+
+
+def warm_up():
+    """Import the pipeline modules and prime matplotlib and the Groq client, then the chart workers."""
+    start = time.perf_counter()
+    try:
+        import app.profiler  # noqa: F401  (pandas/numpy)
+        _prime_charts()
+        _prime_llm_client()
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}", exc_info=True)
+        warm_up_state.error = str(e)
+    finally:
+        warm_up_state.duration_ms = (time.perf_counter() - start) * 1000
+        warm_up_state.done.set()
+        logger.info(f"Warm-up finished in {warm_up_state.duration_ms:.0f}ms")
+    # Only /analyze/batch uses the chart workers, so readiness doesn't wait for them
+    _prime_chart_workers()
+
+
+def start_warm_up() -> threading.Thread:
+    """Run warm_up on a background thread so liveness answers immediately."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
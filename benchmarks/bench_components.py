@@ -0,0 +1,104 @@
+"""
+Time the pipeline components on their own over a grid of synthetic datasets.
+
+Measures profile_dataset (uncached, including the aggregate index),
+generate_chart for the chart_spec and for the chart_code alone (both
+answered from the aggregate index when possible), execute_chart_code and
+generate_reports for every rows × cols × dtype mix × null rate combination.
+
+Usage:
+    python -m benchmarks.bench_components [--rows 1000 10000] [--cols 5 20]
+        [--mixes numeric mixed] [--null-rates 0 0.1] [--repeat 5]
+        [--output results.json] [--baseline previous.json] [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from app.charts import execute_chart_code, generate_chart
+from app.formatter import generate_reports
+from app.profiler import profile_dataset
+from app.schemas import Insight
+
+from benchmarks.common import latency_stats, peak_rss_mb, report, write_results
+from benchmarks.fake_llm import SUMMARY, build_insights
+from benchmarks.synthetic import DTYPE_MIXES, grid, write_csv
+
+
+def _time(func, repeat: int):
+    """Run func repeat times; return (last result, latency stats)."""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - t) * 1000)
+    return result, latency_stats(samples, time.perf_counter() - start)
+
+
+def bench_dataset(csv_path: str, name: str, repeat: int) -> list:
+    """Benchmark each component on one dataset."""
+    rows = []
+    profile, stats = _time(lambda: profile_dataset(csv_path, cached=False), repeat)
+    rows.append({"name": f"{name}/profile_dataset", **stats})
+
+    # Same insights the fake LLM would return for this profile
+    insights = [Insight(**data) for data in build_insights(json.dumps(profile.model_dump()) + " chart_spec")]
+    for i, insight in enumerate(insights):
+        kind = insight.chart_spec.type if insight.chart_spec else "chart"
+        _, stats = _time(lambda: generate_chart(insight, csv_path, i), repeat)
+        rows.append({"name": f"{name}/generate_chart[{kind}]", **stats})
+
+        code_only = insight.model_copy(update={"chart_spec": None})
+        _, stats = _time(lambda: generate_chart(code_only, csv_path, i), repeat)
+        rows.append({"name": f"{name}/generate_chart[{kind},code]", **stats})
+
+        output_path = os.path.join("charts", f"exec_{i}.png")
+        code = insight.chart_code.replace("chart.png", output_path)
+        _, stats = _time(lambda: execute_chart_code(code, csv_path, output_path), repeat)
+        rows.append({"name": f"{name}/execute_chart_code[{kind}]", **stats})
+
+    chart_paths = [os.path.join("charts", f"exec_{i}.png") for i in range(len(insights))]
+    _, stats = _time(lambda: generate_reports(profile, insights, SUMMARY, chart_paths), repeat)
+    rows.append({"name": f"{name}/generate_reports", **stats})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--cols", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--mixes", nargs="+", choices=sorted(DTYPE_MIXES), default=["numeric", "mixed"])
+    parser.add_argument("--null-rates", type=float, nargs="+", default=[0.0, 0.1])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per component")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown before flagging (fraction)")
+    args = parser.parse_args()
+
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # generate_chart writes into the relative charts directory
+        os.chdir(workdir)
+        try:
+            for spec in grid(args.rows, args.cols, args.mixes, args.null_rates):
+                csv_path = write_csv(spec, workdir)
+                results.extend(bench_dataset(csv_path, spec.name, args.repeat))
+        finally:
+            os.chdir(cwd)
+
+    summary = {"name": "process", "peak_rss_mb": peak_rss_mb()}
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    if args.output:
+        write_results(args.output, "components", config, results + [summary])
+    sys.exit(report(results + [summary], args.baseline, threshold=args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Exercise the LLM scheduler against the fake Groq API under a bursty mixed load.
+
+Several clients each submit a burst of batch-priority summary calls (a share
+of them duplicates of prompts already in flight), while a separate client
+sends interactive calls shortly after. The fake API enforces a
+requests-per-minute limit and answers 429 above it, like the real one.
+Reports latency per priority class, 429s seen by the provider, coalesced
+calls and peak provider concurrency.
+
+Usage:
+    python -m benchmarks.bench_llm_scheduler [--clients 3] [--batch-calls 45]
+        [--interactive-calls 15] [--duplicate-rate 0.3] [--llm-latency-ms 200]
+        [--provider-rpm 120] [--scheduler-rpm 120] [--concurrency 4]
+        [--output results.json] [--baseline previous.json] [--threshold 0.1]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_stats, report, write_results
+from benchmarks.fake_llm import start_server
+from benchmarks.synthetic import DatasetSpec, write_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=3, help="Clients submitting batch calls")
+    parser.add_argument("--batch-calls", type=int, default=45, help="Batch calls per client")
+    parser.add_argument("--interactive-calls", type=int, default=15)
+    parser.add_argument("--interactive-delay-ms", type=float, default=500.0, help="When interactive calls start")
+    parser.add_argument("--duplicate-rate", type=float, default=0.3, help="Share of batch calls repeating a prompt")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--provider-rpm", type=int, default=120, help="Fake API requests-per-minute limit")
+    parser.add_argument("--scheduler-rpm", type=float, default=120, help="LLM_REQUESTS_PER_MINUTE (0 disables)")
+    parser.add_argument("--scheduler-tpm", type=float, default=0, help="LLM_TOKENS_PER_MINUTE (0 disables)")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown before flagging (fraction)")
+    args = parser.parse_args()
+
+    llm = start_server(latency_ms=args.llm_latency_ms, rpm_limit=args.provider_rpm)
+    # The app reads its configuration at import time
+    os.environ.update(
+        GROQ_API_KEY="benchmark",
+        GROQ_API_BASE=f"http://127.0.0.1:{llm.server_port}",
+        LLM_REQUESTS_PER_MINUTE=str(args.scheduler_rpm),
+        LLM_TOKENS_PER_MINUTE=str(args.scheduler_tpm),
+        LLM_MAX_CONCURRENCY=str(args.concurrency),
+        LLM_QUEUE_TIMEOUT_S="600",
+    )
+    from prometheus_client import REGISTRY
+    from app.agent import generate_summary
+    from app.llm_scheduler import BATCH, INTERACTIVE
+    from app.profiler import profile_dataset
+    from app.schemas import Insight
+
+    with tempfile.TemporaryDirectory() as workdir:
+        profile = profile_dataset(write_csv(DatasetSpec(1000, 5, "mixed", 0.0), workdir))
+
+    def call(priority: str, client: str, variant: int):
+        # The variant makes the prompt unique; equal variants are identical prompts
+        insights = [Insight(
+            title=f"Finding {variant}", description="Benchmark insight.", rationale="Benchmark.",
+            chart_code="", confidence=0.5,
+        )]
+        start = time.perf_counter()
+        try:
+            generate_summary(profile, insights, priority=priority, client=client)
+            ok = True
+        except Exception:
+            ok = False
+        return priority, (time.perf_counter() - start) * 1000, ok
+
+    rng = random.Random(0)
+    jobs = []
+    for c in range(args.clients):
+        for i in range(args.batch_calls):
+            variant = rng.randrange(i) if i and rng.random() < args.duplicate_rate else i
+            jobs.append((BATCH, f"batch-{c}", c * 100000 + variant))
+    rng.shuffle(jobs)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(jobs) + args.interactive_calls) as pool:
+        futures = [pool.submit(call, *job) for job in jobs]
+        time.sleep(args.interactive_delay_ms / 1000)
+        futures += [
+            pool.submit(call, INTERACTIVE, "interactive", 10 ** 7 + i) for i in range(args.interactive_calls)
+        ]
+        outcomes = [f.result() for f in futures]
+    wall = time.perf_counter() - start
+    llm.shutdown()
+
+    results = []
+    for priority in (INTERACTIVE, BATCH):
+        samples = [ms for p, ms, ok in outcomes if p == priority and ok]
+        errors = sum(1 for p, _, ok in outcomes if p == priority and not ok)
+        results.append({"name": f"llm_{priority}", **latency_stats(samples, wall), "errors": errors})
+    coalesced = REGISTRY.get_sample_value("csv_insight_llm_coalesced_total", {"call": "summary"}) or 0
+    results.append({
+        "name": "provider",
+        "calls": len(outcomes),
+        "provider_requests": llm.stats["requests"],
+        "provider_429s": llm.stats["rate_limited"],
+        "provider_max_concurrent": llm.stats["max_concurrent"],
+        "coalesced": int(coalesced),
+        "wall_s": round(wall, 3),
+    })
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    if args.output:
+        write_results(args.output, "llm_scheduler", config, results)
+    sys.exit(report(results, args.baseline, threshold=args.threshold))
+
+
+if __name__ == "__main__":
+    main()
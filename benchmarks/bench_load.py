@@ -0,0 +1,153 @@
+"""
+Load-test the full /analyze endpoint against a local fake Groq API.
+
+Starts benchmarks.fake_llm in-process and the API under uvicorn in a
+subprocess pointed at it (GROQ_API_BASE), then posts synthetic CSVs with a
+fixed concurrency and reports throughput, latency percentiles, errors and
+the server's peak RSS.
+
+By default every request posts a different CSV (same shape, different
+seed), so each one profiles its dataset and builds the aggregate index like
+an upload the server hasn't seen. --dataset-cache warm posts the same CSV
+every time, measuring the content-digest dataset cache instead; the mode is
+recorded in the results and warm rows are named analyze_c<N>_warm so they
+are never compared against cold baselines.
+
+Usage:
+    python -m benchmarks.bench_load [--requests 40] [--concurrency 4]
+        [--llm-latency-ms 800] [--rows 5000] [--cols 8] [--chart-spec-mode]
+        [--dataset-cache cold|warm]
+        [--server-logs] [--output results.json] [--baseline previous.json] [--threshold 0.1]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.common import latency_stats, process_peak_rss_mb, report, write_results
+from benchmarks.fake_llm import start_server
+from benchmarks.synthetic import DTYPE_MIXES, DatasetSpec, write_csv
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api(port: int, llm_base: str, chart_spec_mode: bool, show_logs: bool = False) -> subprocess.Popen:
+    """Run the API under uvicorn and wait until /health/ready answers (warm-up done)."""
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="benchmark",
+        GROQ_API_BASE=llm_base,
+        CHART_SPEC_MODE="true" if chart_spec_mode else "false",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=None if show_logs else subprocess.DEVNULL,
+        stderr=None if show_logs else subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health/ready", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API did not become ready within 60s")
+
+
+def post_csv(url: str, csv_path: str) -> tuple:
+    """Post one CSV; return (latency ms, HTTP status or 0 on connection error)."""
+    start = time.perf_counter()
+    try:
+        with open(csv_path, "rb") as f:
+            response = httpx.post(url, files={"file": (os.path.basename(csv_path), f, "text/csv")}, timeout=300)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    return (time.perf_counter() - start) * 1000, status
+
+
+def write_datasets(spec: DatasetSpec, workdir: str, count: int, distinct: bool) -> list:
+    """Write count CSVs for spec (one per seed when distinct, else one shared file)."""
+    if not distinct:
+        return [write_csv(spec, workdir)] * count
+    paths = []
+    for seed in range(count):
+        directory = os.path.join(workdir, str(seed))
+        os.makedirs(directory)
+        paths.append(write_csv(spec, directory, seed=seed))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="Total /analyze requests")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="Fake LLM response delay")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--mix", choices=sorted(DTYPE_MIXES), default="mixed")
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--chart-spec-mode", action="store_true", help="Ask for chart specs (native renderer)")
+    parser.add_argument(
+        "--dataset-cache", choices=["cold", "warm"], default="cold",
+        help="cold: a distinct CSV per request; warm: the same CSV, served from the dataset cache"
+    )
+    parser.add_argument("--server-logs", action="store_true", help="Show the API's log output")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown before flagging (fraction)")
+    args = parser.parse_args()
+
+    llm = start_server(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms)
+    port = _free_port()
+    api = start_api(port, f"http://127.0.0.1:{llm.server_port}", args.chart_spec_mode, args.server_logs)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            spec = DatasetSpec(args.rows, args.cols, args.mix, args.null_rate)
+            # One extra file for the warm-up request
+            csv_paths = write_datasets(spec, workdir, args.requests + 1, args.dataset_cache == "cold")
+            url = f"http://127.0.0.1:{port}/analyze"
+            post_csv(url, csv_paths[-1])  # Warm-up request, not measured
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                outcomes = list(pool.map(lambda path: post_csv(url, path), csv_paths[:-1]))
+            wall = time.perf_counter() - start
+        peak_rss = process_peak_rss_mb(api.pid)
+    finally:
+        api.terminate()
+        api.wait(timeout=30)
+        llm.shutdown()
+
+    ok = [ms for ms, status in outcomes if status == 200]
+    result = {
+        "name": f"analyze_c{args.concurrency}" + ("_warm" if args.dataset_cache == "warm" else ""),
+        "dataset_cache": args.dataset_cache,
+        **latency_stats(ok, wall),
+        "errors": len(outcomes) - len(ok),
+        "server_peak_rss_mb": peak_rss,
+    }
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "server_logs")}
+    if args.output:
+        write_results(args.output, "load", config, [result])
+    sys.exit(report([result], args.baseline, threshold=args.threshold))
+
+
+if __name__ == "__main__":
+    main()
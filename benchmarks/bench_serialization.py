@@ -0,0 +1,127 @@
+"""
+Benchmark JSON serialization time and wire size of typical /analyze responses.
+
+Compares the standard-library json encoder used by JSONResponse with the
+pydantic-core encoder used by app.responses, and the size of each payload
+uncompressed, gzipped and brotli-compressed.
+
+Usage:
+    python -m benchmarks.bench_serialization [--rows 5000] [--repeat 50] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+
+from app.charts import execute_chart_code
+from app.formatter import ReportRenderer, encode_chart_asset
+from app.profiler import profile_dataset
+from app.responses import brotli, compress, encode_json
+from app.schemas import Insight, Report
+
+from benchmarks.common import write_results
+
+CHART_CODE = [
+    "plt.figure(figsize=(10, 6))\nplt.hist(df['value'], bins=30)\nplt.title('Distribution of value')",
+    "plt.figure(figsize=(10, 6))\ndf['category'].value_counts().plot(kind='bar')\nplt.title('Category counts')",
+    "plt.figure(figsize=(10, 6))\nplt.scatter(df['value'], df['score'], alpha=0.5)\nplt.title('Value vs score')",
+]
+
+
+def build_report(rows: int, workdir: str, include_reports: bool):
+    """Build the Report and profile dict of an /analyze response for a synthetic dataset."""
+    rng = np.random.default_rng(0)
+    csv_path = os.path.join(workdir, "data.csv")
+    pd.DataFrame({
+        "value": rng.normal(50, 10, rows),
+        "score": rng.uniform(0, 1, rows),
+        "category": rng.choice(["north", "south", "east", "west"], rows),
+    }).to_csv(csv_path, index=False)
+    
+    profile = profile_dataset(csv_path)
+    insights, assets = [], []
+    for i, code in enumerate(CHART_CODE):
+        output_path = os.path.join(workdir, f"insight_{i}.png")
+        execute_chart_code(f"{code}\nplt.savefig('{output_path}', dpi=150, bbox_inches='tight')\nplt.close()", csv_path, output_path)
+        insights.append(Insight(
+            title=f"Insight {i + 1}",
+            description="A representative description of a pattern found in the dataset. " * 3,
+            rationale="Why this pattern matters for the business question at hand. " * 2,
+            chart_code=code,
+            chart_path=output_path,
+        ))
+        assets.append(encode_chart_asset(output_path))
+    
+    summary = "Executive summary of the dataset and its key findings. " * 12
+    renderer = ReportRenderer(profile, insights, summary, assets)
+    report = Report(
+        dataset_overview=f"Dataset contains {rows:,} rows and {profile.n_cols} columns.",
+        insights=insights,
+        summary=summary,
+        charts=[a.data_uri if include_reports else f"/reports/id/charts/{i}.png" for i, a in enumerate(assets)],
+        markdown_report=renderer.markdown if include_reports else None,
+        html_report=renderer.html() if include_reports else None,
+        report_id="id",
+        links={"markdown": "/reports/id.md", "html": "/reports/id.html"},
+    )
+    profile_data = profile.model_dump(include={"n_rows", "n_cols", "columns", "dtypes", "null_counts", "unique_counts"})
+    return report, profile_data
+
+
+def time_call(func, repeat: int) -> float:
+    """Median wall time of func() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(rows: int, repeat: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, include_reports in (("links", False), ("inline", True)):
+            report, profile_data = build_report(rows, workdir, include_reports)
+            # Previous path: model_dump() then JSONResponse's json.dumps
+            stdlib_ms = time_call(lambda: json.dumps({**report.model_dump(), "profile": profile_data}).encode("utf-8"), repeat)
+            fast_ms = time_call(lambda: encode_json({**dict(report), "profile": profile_data}), repeat)
+            body = encode_json({**dict(report), "profile": profile_data})
+            result = {
+                "payload": label,
+                "stdlib_json_ms": round(stdlib_ms, 3),
+                "pydantic_core_ms": round(fast_ms, 3),
+                "raw_bytes": len(body),
+                "gzip_bytes": len(compress(body, "gzip")),
+                "gzip_ms": round(time_call(lambda: compress(body, "gzip"), repeat), 3),
+            }
+            if brotli is not None:
+                result["br_bytes"] = len(compress(body, "br"))
+                result["br_ms"] = round(time_call(lambda: compress(body, "br"), repeat), 3)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Rows in the synthetic dataset")
+    parser.add_argument("--repeat", type=int, default=50, help="Timing repetitions per measurement")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+    
+    results = run(args.rows, args.repeat)
+    for result in results:
+        print(", ".join(f"{key}={value}" for key, value in result.items()))
+    if args.output:
+        write_results(args.output, "serialization", {"rows": args.rows, "repeat": args.repeat}, results)
+
+
+if __name__ == "__main__":
+    main()
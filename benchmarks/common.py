@@ -0,0 +1,107 @@
+"""Shared helpers for benchmark statistics, result files and regression checks."""
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List, Sequence
+import numpy as np
+
+
+def latency_stats(samples_ms: Sequence[float], wall_seconds: float) -> Dict[str, float]:
+    """Summarize latency samples as throughput and p50/p95/p99/max in milliseconds."""
+    samples = np.asarray(samples_ms, dtype=float)
+    if samples.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(samples.size),
+        "throughput_per_s": round(samples.size / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def process_peak_rss_mb(pid: int) -> float:
+    """Peak resident set size of another process (Linux only), or 0.0 if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, benchmark: str, config: dict, results: List[dict]):
+    """Write results as JSON with enough metadata to compare runs later."""
+    payload = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def compare_results(current: List[dict], baseline_path: str, key: str, threshold: float) -> List[str]:
+    """
+    Compare results against a baseline file written by write_results.
+
+    Rows are matched on key; any *_ms or *_mb metric more than threshold
+    (a fraction, e.g. 0.1 for 10%) above the baseline is reported.
+
+    Returns:
+        Human-readable regression messages (empty if none)
+    """
+    with open(baseline_path) as f:
+        baseline = {row[key]: row for row in json.load(f)["results"]}
+    regressions = []
+    for row in current:
+        base = baseline.get(row[key])
+        if base is None:
+            continue
+        for metric, value in row.items():
+            if not metric.endswith(("_ms", "_mb")) or not isinstance(base.get(metric), (int, float)):
+                continue
+            if base[metric] > 0 and value > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{row[key]} {metric}: {base[metric]} -> {value} (+{(value / base[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def report(results: List[dict], baseline: str = None, key: str = "name", threshold: float = 0.1) -> int:
+    """Print results (and regressions against baseline); return a process exit code."""
+    for row in results:
+        print(", ".join(f"{k}={v}" for k, v in row.items()))
+    if baseline:
+        regressions = compare_results(results, baseline, key, threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
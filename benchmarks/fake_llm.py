@@ -0,0 +1,214 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Answers insight prompts with three insights over columns found in the
+profile and summary prompts with a fixed summary, after a configurable
+delay. With a requests-per-minute limit it answers 429 like the real API
+once its bucket (a minute's worth of requests, refilled continuously) is
+empty. Point the app at it with
+GROQ_API_BASE=http://127.0.0.1:<port>.
+
+Usage:
+    python -m benchmarks.fake_llm --port 8090 --latency-ms 800 --jitter-ms 200 [--rpm-limit 30]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUMMARY = (
+    "The dataset is of moderate size with a mix of numeric and categorical columns. "
+    "The key insights highlight the distribution of the main numeric measure, the "
+    "balance between categories and a relationship between two numeric columns. "
+    "Missing values are present in some columns and should be handled before modelling. "
+    "We recommend validating the strongest relationship and monitoring category balance."
+)
+
+
+def _profile_columns(prompt: str):
+    """Return (numeric, categorical) column names from the profile JSON in a prompt."""
+    match = re.search(r'"dtypes":\s*(\{.*?\})', prompt, re.DOTALL)
+    dtypes = json.loads(match.group(1)) if match else {}
+    numeric = [c for c, t in dtypes.items() if t == "numeric"]
+    categorical = [c for c, t in dtypes.items() if t != "numeric"]
+    return numeric, categorical
+
+
+def _insight(title, code, spec):
+    return {
+        "title": title,
+        "description": f"{title} across the dataset, based on the profile statistics.",
+        "rationale": "This shows where values concentrate and which patterns deserve follow-up.",
+        "chart_code": code + "\nplt.savefig('chart.png', dpi=150, bbox_inches='tight')\nplt.close()",
+        "chart_spec": spec,
+        "confidence": 0.8,
+    }
+
+
+def build_insights(prompt: str) -> list:
+    """Three insights that reference real columns, mirroring typical LLM output."""
+    numeric, categorical = _profile_columns(prompt)
+    insights = []
+    if numeric:
+        x = numeric[0]
+        insights.append(_insight(
+            f"Distribution of {x}",
+            f"plt.figure(figsize=(10, 6))\nplt.hist(df['{x}'].dropna(), bins=30)\nplt.xlabel('{x}')",
+            {"type": "histogram", "x": x, "bins": 30},
+        ))
+    if categorical:
+        x = categorical[0]
+        insights.append(_insight(
+            f"Frequency of {x}",
+            f"plt.figure(figsize=(10, 6))\ndf['{x}'].value_counts().plot(kind='bar')\nplt.xlabel('{x}')",
+            {"type": "bar", "x": x, "aggregation": "count"},
+        ))
+    if len(numeric) >= 2:
+        x, y = numeric[0], numeric[1]
+        insights.append(_insight(
+            f"{x} versus {y}",
+            f"plt.figure(figsize=(10, 6))\nplt.scatter(df['{x}'], df['{y}'], alpha=0.5)\nplt.xlabel('{x}')\nplt.ylabel('{y}')",
+            {"type": "scatter", "x": x, "y": y},
+        ))
+    elif numeric and categorical:
+        x, y = categorical[0], numeric[0]
+        insights.append(_insight(
+            f"Average {y} by {x}",
+            f"plt.figure(figsize=(10, 6))\ndf.groupby('{x}')['{y}'].mean().plot(kind='bar')",
+            {"type": "bar", "x": x, "y": y, "aggregation": "mean"},
+        ))
+    return insights
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /openai/v1/chat/completions handler."""
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    rpm_limit = 0
+    # Shared per configured server: request bucket and request counts
+    bucket: dict = {}
+    lock = threading.Lock()
+    stats: dict = {}
+
+    def _rate_limited(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.rpm_limit:
+                elapsed = now - self.bucket.setdefault("updated", now)
+                level = min(self.rpm_limit, self.bucket.get("level", self.rpm_limit) + elapsed * self.rpm_limit / 60)
+                self.bucket.update(updated=now, level=level)
+                if level < 1:
+                    self.stats["rate_limited"] += 1
+                    return True
+                self.bucket["level"] = level - 1
+            self.stats["max_concurrent"] = max(self.stats["max_concurrent"], self.stats["in_flight"] + 1)
+            self.stats["in_flight"] += 1
+            return False
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self._rate_limited():
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached for requests per minute",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, {"Retry-After": "2"})
+            return
+        try:
+            self._complete(body)
+        finally:
+            with self.lock:
+                self.stats["in_flight"] -= 1
+
+    def _complete(self, body: dict):
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+
+        if "executive summary" in prompt.lower():
+            content = SUMMARY
+        else:
+            insights = build_insights(prompt)
+            if "chart_spec" not in prompt:
+                for insight in insights:
+                    insight.pop("chart_spec")
+            content = json.dumps(insights)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(
+    port: int = 0,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    rpm_limit: int = 0
+) -> ThreadingHTTPServer:
+    """
+    Start the fake API on a daemon thread and return the server.
+
+    server.server_port is the bound port; server.stats counts requests,
+    429 responses and the peak number of requests served concurrently.
+    """
+    handler = type("ConfiguredFakeGroqHandler", (FakeGroqHandler,), {
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "rpm_limit": rpm_limit,
+        "bucket": {},
+        "lock": threading.Lock(),
+        "stats": {"requests": 0, "rate_limited": 0, "in_flight": 0, "max_concurrent": 0},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.stats = handler.stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Answer 429 above this many requests per minute")
+    args = parser.parse_args()
+    server = start_server(args.port, args.latency_ms, args.jitter_ms, args.rpm_limit)
+    print(f"Fake Groq API listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
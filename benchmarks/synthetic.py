@@ -0,0 +1,114 @@
+"""
+Synthetic CSV generator for benchmarks.
+
+Datasets are described by rows × columns × dtype mix × null rate and are
+deterministic for a given spec, so runs can be compared.
+
+Usage:
+    python -m benchmarks.synthetic --rows 10000 --cols 8 --mix mixed --null-rate 0.05 out.csv
+"""
+import argparse
+import itertools
+import os
+from typing import Iterator, NamedTuple, Sequence
+import numpy as np
+import pandas as pd
+
+# Share of numeric columns for each dtype mix
+DTYPE_MIXES = {"numeric": 1.0, "mixed": 0.5, "categorical": 0.0}
+
+CATEGORIES = ["north", "south", "east", "west", "central", "online", "partner", "other"]
+
+
+class DatasetSpec(NamedTuple):
+    """Shape of a synthetic dataset."""
+    rows: int
+    cols: int
+    mix: str
+    null_rate: float
+
+    @property
+    def name(self) -> str:
+        return f"r{self.rows}_c{self.cols}_{self.mix}_n{int(self.null_rate * 100)}"
+
+
+def generate_dataframe(spec: DatasetSpec, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a DataFrame matching spec.
+
+    Numeric columns alternate between normal, uniform, integer-count and
+    trending (cumulative sum) distributions; categorical columns draw from a
+    skewed set of labels, and every third one is a date string column.
+
+    Args:
+        spec: Dataset shape
+        seed: Random seed
+
+    Returns:
+        DataFrame with spec.rows rows and spec.cols columns
+    """
+    if spec.mix not in DTYPE_MIXES:
+        raise ValueError(f"Unknown dtype mix {spec.mix!r}; expected one of {sorted(DTYPE_MIXES)}")
+    rng = np.random.default_rng(seed)
+    n_numeric = round(spec.cols * DTYPE_MIXES[spec.mix])
+    data = {}
+    for i in range(n_numeric):
+        kind = i % 4
+        if kind == 0:
+            values = rng.normal(100, 15, spec.rows)
+        elif kind == 1:
+            values = rng.uniform(0, 1, spec.rows)
+        elif kind == 2:
+            values = rng.poisson(5, spec.rows).astype(float)
+        else:
+            values = rng.normal(0, 1, spec.rows).cumsum()
+        data[f"num_{i}"] = values
+    weights = np.linspace(1, 0.2, len(CATEGORIES))
+    weights /= weights.sum()
+    for i in range(spec.cols - n_numeric):
+        if i % 3 == 2:
+            start = np.datetime64("2020-01-01")
+            values = (start + rng.integers(0, 1500, spec.rows)).astype(str).astype(object)
+        else:
+            values = rng.choice(CATEGORIES, size=spec.rows, p=weights).astype(object)
+        data[f"cat_{i}"] = values
+    df = pd.DataFrame(data)
+    if spec.null_rate > 0:
+        mask = rng.random(df.shape) < spec.null_rate
+        df = df.mask(mask)
+    return df
+
+
+def write_csv(spec: DatasetSpec, directory: str, seed: int = 0) -> str:
+    """Generate the dataset for spec into directory and return the CSV path."""
+    path = os.path.join(directory, f"{spec.name}.csv")
+    generate_dataframe(spec, seed).to_csv(path, index=False)
+    return path
+
+
+def grid(
+    rows: Sequence[int],
+    cols: Sequence[int],
+    mixes: Sequence[str],
+    null_rates: Sequence[float]
+) -> Iterator[DatasetSpec]:
+    """Yield every DatasetSpec in the rows × cols × mixes × null rates grid."""
+    for r, c, m, n in itertools.product(rows, cols, mixes, null_rates):
+        yield DatasetSpec(r, c, m, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="CSV path to write")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--mix", choices=sorted(DTYPE_MIXES), default="mixed")
+    parser.add_argument("--null-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    spec = DatasetSpec(args.rows, args.cols, args.mix, args.null_rate)
+    generate_dataframe(spec, args.seed).to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,14 @@ export interface AnalyzeResponse {
   dataset_overview: string;
   insights: Insight[];
   summary: string;
-  charts: string[];
+  charts: (string | null)[];
   markdown_report?: string;
   html_report?: string;
+  report_id?: string;
+  links?: {
+    markdown: string;
+    html: string;
+  };
   profile?: {
     n_rows: number;
     n_cols: number;
@@ -23,7 +28,9 @@ export interface AnalyzeResponse {
     dtypes: Record<string, string>;
     null_counts: Record<string, number>;
     unique_counts: Record<string, number>;
+    sampled_rows?: number | null;
   };
+  quality_tier?: string;
 }
 
 export interface Insight {
@@ -35,6 +42,15 @@ export interface Insight {
   confidence: number;
 }
 
+// Charts and reports are returned as paths on the API server; data URIs pass through unchanged
+export const resolveApiUrl = (path: string): string =>
+  path.startsWith('/') ? `${API_BASE_URL}${path}` : path;
+
+export const fetchReport = async (path: string): Promise<Blob> => {
+  const response = await apiClient.get<Blob>(path, { responseType: 'blob' });
+  return response.data;
+};
+
 export const analyzeCSV = async (file: File): Promise<AnalyzeResponse> => {
   const formData = new FormData();
   formData.append('file', file);
@@ -6,6 +6,7 @@ interface DatasetOverviewProps {
   null_counts: Record<string, number>;
   unique_counts: Record<string, number>;
   n_rows: number;
+  approximate?: boolean;
 }
 
 export default function DatasetOverview({
@@ -14,6 +15,7 @@ export default function DatasetOverview({
   null_counts,
   unique_counts,
   n_rows,
+  approximate = false,
 }: DatasetOverviewProps) {
   return (
     <div className="mt-4 overflow-hidden rounded-lg border border-border-light dark:border-border-dark bg-card-light dark:bg-card-dark">
@@ -52,7 +54,7 @@ export default function DatasetOverview({
                   <td className="px-6 py-4">
                     {nullCount} ({nullPct}%)
                   </td>
-                  <td className="px-6 py-4">{uniqueCount.toLocaleString()}</td>
+                  <td className="px-6 py-4">{approximate ? '≥' : ''}{uniqueCount.toLocaleString()}</td>
                 </tr>
               );
             })}
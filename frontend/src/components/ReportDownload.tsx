@@ -1,34 +1,44 @@
+import { fetchReport } from '../api/client';
+
 interface ReportDownloadProps {
   markdownReport?: string;
   htmlReport?: string;
+  markdownUrl?: string;
+  htmlUrl?: string;
   filename?: string;
 }
 
+const saveBlob = (blob: Blob, name: string) => {
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = name;
+  a.click();
+  URL.revokeObjectURL(url);
+};
+
 export default function ReportDownload({
   markdownReport,
   htmlReport,
+  markdownUrl,
+  htmlUrl,
   filename = 'analysis_report',
 }: ReportDownloadProps) {
-  const downloadMarkdown = () => {
-    if (!markdownReport) return;
-    const blob = new Blob([markdownReport], { type: 'text/markdown' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `${filename}.md`;
-    a.click();
-    URL.revokeObjectURL(url);
+  // Reports are rendered by the API on first request unless they came inline with the analysis
+  const downloadMarkdown = async () => {
+    if (markdownReport) {
+      saveBlob(new Blob([markdownReport], { type: 'text/markdown' }), `${filename}.md`);
+    } else if (markdownUrl) {
+      saveBlob(await fetchReport(markdownUrl), `${filename}.md`);
+    }
   };
 
-  const downloadHTML = () => {
-    if (!htmlReport) return;
-    const blob = new Blob([htmlReport], { type: 'text/html' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `${filename}.html`;
-    a.click();
-    URL.revokeObjectURL(url);
+  const downloadHTML = async () => {
+    if (htmlReport) {
+      saveBlob(new Blob([htmlReport], { type: 'text/html' }), `${filename}.html`);
+    } else if (htmlUrl) {
+      saveBlob(await fetchReport(htmlUrl), `${filename}.html`);
+    }
   };
 
   return (
@@ -45,7 +55,7 @@ export default function ReportDownload({
         </p>
         <button
           onClick={downloadMarkdown}
-          disabled={!markdownReport}
+          disabled={!markdownReport && !markdownUrl}
           className="mt-auto flex w-fit cursor-pointer items-center justify-center gap-2 overflow-hidden rounded-lg h-10 px-4 bg-primary text-white text-sm font-bold leading-normal tracking-[0.015em] transition-colors hover:bg-primary/90 disabled:opacity-50 disabled:cursor-not-allowed"
         >
           <span className="material-symbols-outlined !text-lg">download</span>
@@ -64,7 +74,7 @@ export default function ReportDownload({
         </p>
         <button
           onClick={downloadHTML}
-          disabled={!htmlReport}
+          disabled={!htmlReport && !htmlUrl}
           className="mt-auto flex w-fit cursor-pointer items-center justify-center gap-2 overflow-hidden rounded-lg h-10 px-4 bg-primary text-white text-sm font-bold leading-normal tracking-[0.015em] transition-colors hover:bg-primary/90 disabled:opacity-50 disabled:cursor-not-allowed"
         >
           <span className="material-symbols-outlined !text-lg">download</span>
@@ -50,6 +50,8 @@ export default function DownloadPage() {
           <ReportDownload
             markdownReport={result.markdown_report}
             htmlReport={result.html_report}
+            markdownUrl={result.links?.markdown}
+            htmlUrl={result.links?.html}
             filename={fileName}
           />
         </div>
@@ -3,7 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import DatasetOverview from '../components/DatasetOverview';
 import InsightCard from '../components/InsightCard';
 import ChartPreview from '../components/ChartPreview';
-import { AnalyzeResponse } from '../api/client';
+import { AnalyzeResponse, resolveApiUrl } from '../api/client';
 
 export default function ResultsPage() {
   const [result, setResult] = useState<AnalyzeResponse | null>(null);
@@ -130,6 +130,11 @@ export default function ResultsPage() {
                 <p className="text-subtle-light dark:text-subtle-dark text-base font-normal leading-normal">
                   A comprehensive overview of your dataset's structure, insights, and visualizations.
                 </p>
+                {result.quality_tier && result.quality_tier !== 'full' && (
+                  <p className="text-sm font-medium text-amber-600 dark:text-amber-400">
+                    The service is under heavy load, so this analysis was simplified ({result.quality_tier.replace(/_/g, ' ')}).
+                  </p>
+                )}
               </div>
               <button
                 onClick={() => navigate('/download')}
@@ -213,6 +218,7 @@ export default function ResultsPage() {
                           null_counts={profile.null_counts || {}}
                           unique_counts={profile.unique_counts || {}}
                           n_rows={profile.n_rows || 0}
+                          approximate={profile.sampled_rows != null}
                         />
                       )}
                     </div>
@@ -229,6 +235,7 @@ export default function ResultsPage() {
                       null_counts={profile.null_counts || {}}
                       unique_counts={profile.unique_counts || {}}
                       n_rows={profile.n_rows || 0}
+                      approximate={profile.sampled_rows != null}
                     />
                   </div>
                 </section>
@@ -250,7 +257,7 @@ export default function ResultsPage() {
                     {result.insights.map((insight, index) => (
                       <ChartPreview
                         key={index}
-                        chartData={result.charts[index] || null}
+                        chartData={result.charts[index] ? resolveApiUrl(result.charts[index] as string) : null}
                         title={insight.title}
                       />
                     ))}
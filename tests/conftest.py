@@ -0,0 +1,47 @@
+"""Shared fixtures: the API app wired to the fake Groq server."""
+import io
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+# Config is read at import, so these must be set before anything imports app.config
+os.environ["GROQ_API_KEY"] = "test"
+os.environ["WARMUP_ON_STARTUP"] = "false"
+
+
+@pytest.fixture(scope="session")
+def fake_llm():
+    from benchmarks.fake_llm import start_server
+
+    server = start_server()
+    os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def client(fake_llm):
+    from app.api import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def make_csv(rows: int = 200, seed: int = 0) -> bytes:
+    """A small mixed-type CSV the fake LLM can write insights about."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "price": rng.normal(100, 15, rows).round(2),
+        "quantity": rng.integers(1, 50, rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+    })
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+@pytest.fixture
+def csv_bytes() -> bytes:
+    return make_csv()
@@ -0,0 +1,100 @@
+"""The aggregate index answers chart specs exactly like the raw-data path."""
+import numpy as np
+import pandas as pd
+import pytest
+from app.aggregates import AggregateIndex, DatasetCache
+from app.charts import chart_data_from_frame, chart_data_from_index, infer_chart_spec
+from app.schemas import ChartSpec, DatasetProfile
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(1)
+    n = 5000
+    frame = pd.DataFrame({
+        "amount": rng.normal(100, 15, n),
+        "count": rng.poisson(5, n).astype(float),
+        "region": rng.choice(["north", "south", "east", "west"], n),
+    })
+    frame.loc[rng.random(n) < 0.05, "amount"] = np.nan
+    return frame
+
+
+@pytest.mark.parametrize("bins", [10, 20, 30, 60])
+def test_histogram_matches_frame(df, bins):
+    spec = ChartSpec(type="histogram", x="amount", bins=bins)
+    index = AggregateIndex.build(df)
+    expected = chart_data_from_frame(spec, df)
+    actual = chart_data_from_index(spec, index)
+    np.testing.assert_array_equal(actual.y, expected.y)
+    np.testing.assert_allclose(actual.x, expected.x)
+
+
+def test_histogram_declines_bins_not_dividing_resolution(df):
+    index = AggregateIndex.build(df)
+    assert chart_data_from_index(ChartSpec(type="histogram", x="amount", bins=7), index) is None
+
+
+def test_value_counts_bar_matches_frame(df):
+    spec = ChartSpec(type="bar", x="region", aggregation="count")
+    actual = chart_data_from_index(spec, AggregateIndex.build(df))
+    expected = chart_data_from_frame(spec, df)
+    assert list(actual.x) == list(expected.x)
+    np.testing.assert_array_equal(actual.y, expected.y)
+
+
+@pytest.mark.parametrize("aggregation", ["sum", "mean", "min", "max"])
+def test_group_aggregate_matches_pandas(df, aggregation):
+    index = AggregateIndex.build(df)
+    expected = df.groupby("region")["amount"].agg(aggregation)
+    actual = index.group_aggregate("region", "amount", aggregation)
+    pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+
+def test_group_aggregate_median_is_not_indexed(df):
+    spec = ChartSpec(type="bar", x="region", y="amount", aggregation="median")
+    assert chart_data_from_index(spec, AggregateIndex.build(df)) is None
+
+
+def test_scatter_points_are_bounded_sample(df):
+    spec = ChartSpec(type="scatter", x="amount", y="count")
+    data = chart_data_from_index(spec, AggregateIndex.build(df))
+    assert 0 < len(data.x) == len(data.y) <= len(df)
+    assert not np.isnan(data.x).any()
+
+
+def test_sampled_index_scales_counts(df):
+    sample = df.sample(n=1000, random_state=0)
+    index = AggregateIndex.build(sample, scale=len(df) / len(sample))
+    counts = index.top_values("region")
+    assert abs(counts.sum() - len(df)) <= len(counts)
+
+
+def test_infer_chart_spec_keeps_labels():
+    spec = infer_chart_spec(
+        "plt.figure(figsize=(8, 5))\n"
+        "plt.hist(df['amount'], bins=20)\n"
+        "plt.xlabel('Amount ($)')\n"
+        "plt.ylabel('Orders')\n"
+        "plt.title('Order amounts')\n"
+        "plt.savefig('chart.png')"
+    )
+    assert (spec.type, spec.x, spec.bins) == ("histogram", "amount", 20)
+    assert (spec.title, spec.xlabel, spec.ylabel) == ("Order amounts", "Amount ($)", "Orders")
+
+
+def test_infer_chart_spec_declines_computed_labels():
+    assert infer_chart_spec("plt.hist(df['amount'])\nplt.xlabel(f'{name}')") is None
+
+
+def test_dataset_cache_keeps_exact_entry():
+    cache = DatasetCache(max_datasets=2)
+    profile = DatasetProfile(
+        columns=[], dtypes={}, null_counts={}, summary_stats={}, correlations={}, n_rows=0, n_cols=0
+    )
+    cache.put("a", profile, AggregateIndex(0))
+    cache.put("a", profile, AggregateIndex(0), sampled=True)
+    assert cache.get("a").sampled is False
+    cache.put("b", profile, AggregateIndex(0))
+    cache.put("c", profile, AggregateIndex(0))
+    assert cache.get("a") is None
@@ -0,0 +1,91 @@
+"""Batch uploads: zip extraction limits and the /analyze/batch endpoint."""
+import io
+import struct
+import zipfile
+import pytest
+from prometheus_client import REGISTRY
+from app.batch import extract_zip
+from conftest import make_csv
+
+MB = 1024 * 1024
+
+
+def _zip(members, method=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", method) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _csv(rows: int) -> bytes:
+    return b"x,y\n" + b"".join(b"%d,%d\n" % (i, i * 7) for i in range(rows))
+
+
+def test_extracts_csv_members_only():
+    content = _zip([("data/a.csv", _csv(100)), ("notes.txt", b"hi"), ("__MACOSX/._a.csv", b"x"), ("b.csv", _csv(5))])
+    assert [name for name, _ in extract_zip(content, 10, 50 * MB)] == ["a.csv", "b.csv"]
+
+
+def test_rejects_too_many_files():
+    content = _zip([(f"{i}.csv", _csv(5)) for i in range(3)])
+    with pytest.raises(ValueError, match="Maximum allowed is 2"):
+        extract_zip(content, 2, 50 * MB)
+
+
+def test_rejects_high_compression_ratio():
+    content = _zip([("bomb.csv", b"0" * (1900 * 1024))])
+    with pytest.raises(ValueError, match="compression ratio"):
+        extract_zip(content, 10, 50 * MB)
+
+
+def test_enforces_total_size_across_members():
+    data = bytes(range(256)) * 4000  # ~1MB, incompressible enough
+    content = _zip([(f"{i}.csv", data) for i in range(3)], zipfile.ZIP_STORED)
+    with pytest.raises(ValueError, match="2.csv"):
+        extract_zip(content, 10, int(2.5 * MB))
+
+
+def test_does_not_trust_declared_size():
+    data = bytes(range(256)) * 12000  # ~3MB, over the per-file limit
+    forged = bytearray(_zip([("a.csv", data)], zipfile.ZIP_STORED))
+    central_directory = forged.rfind(b"PK\x01\x02")
+    struct.pack_into("<I", forged, central_directory + 24, 100)  # Declared uncompressed size
+    with pytest.raises(ValueError):
+        extract_zip(bytes(forged), 10, 50 * MB)
+
+
+def test_rejects_invalid_archive():
+    with pytest.raises(ValueError, match="not a valid zip"):
+        extract_zip(b"not a zip", 10, 50 * MB)
+
+
+def _chart_attempts() -> float:
+    return sum(
+        REGISTRY.get_sample_value("csv_insight_charts_total", {"path": path, "outcome": outcome}) or 0
+        for path in ("index", "spec", "exec")
+        for outcome in ("success", "failure")
+    )
+
+
+def test_batch_endpoint_analyzes_every_file(client):
+    before = _chart_attempts()
+    archive = _zip([("a.csv", make_csv(seed=1)), ("b.csv", make_csv(seed=2))])
+    response = client.post("/analyze/batch", files=[
+        ("files", ("batch.zip", archive, "application/zip")),
+        ("files", ("c.csv", make_csv(seed=3), "text/csv")),
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["overview"]["succeeded"] == 3 and body["overview"]["failed"] == 0
+    assert [report["filename"] for report in body["reports"]] == ["a.csv", "b.csv", "c.csv"]
+
+    chart_urls = [url for report in body["reports"] for url in report["charts"] if url]
+    assert chart_urls and client.get(chart_urls[0]).status_code == 200
+    # Charts render in worker processes, but their metrics land in this process
+    assert _chart_attempts() - before >= len(chart_urls)
+
+
+def test_batch_endpoint_rejects_invalid_members(client):
+    response = client.post("/analyze/batch", files=[("files", ("notes.txt", b"hello", "text/plain"))])
+    assert response.status_code == 400 and "must be a CSV" in response.json()["detail"]
@@ -0,0 +1,33 @@
+"""Chart rendering from worker threads."""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from app.charts import draw_chart, execute_chart_code, ChartData
+from app.schemas import ChartSpec
+
+
+def test_exec_charts_dont_share_figures_across_threads(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    pd.DataFrame({"x": range(50), "y": range(50)}).to_csv(csv_path, index=False)
+
+    def render(n):
+        # Each chart draws n lines and fails if another thread drew into its figure
+        code = (
+            f"for i in range({n}):\n"
+            "    plt.plot(df['x'], df['y'] * i)\n"
+            f"assert len(plt.gca().lines) == {n}\n"
+            f"plt.savefig('{tmp_path / f'{n}.png'}')"
+        )
+        return execute_chart_code(code, str(csv_path), str(tmp_path / f"{n}.png"))
+
+    with ThreadPoolExecutor(8) as pool:
+        assert all(pool.map(render, range(1, 33)))
+
+
+def test_draw_chart_does_not_touch_pyplot(tmp_path):
+    import matplotlib.pyplot as plt
+
+    spec = ChartSpec(type="line", x="x", y="y")
+    data = ChartData(np.arange(10), np.arange(10), "y")
+    assert draw_chart(spec, data, str(tmp_path / "chart.png"), dpi=50)
+    assert plt.get_fignums() == []
@@ -0,0 +1,100 @@
+"""Draw-time data reduction."""
+import threading
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from app.downsample import lttb, reduced_plotting, stratified_sample, uniform_sample
+
+
+@pytest.fixture
+def ax():
+    fig, ax = plt.subplots()
+    yield ax
+    plt.close(fig)
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    x = np.arange(10000, dtype=float)
+    y = np.zeros_like(x)
+    y[4321] = 100
+    idx = lttb(x, y, 100)
+    assert len(idx) == 100 and idx[0] == 0 and idx[-1] == 9999 and 4321 in idx
+
+
+def test_stratified_sample_keeps_rare_labels():
+    labels = np.array(["common"] * 9990 + ["rare"] * 10)
+    assert "rare" in set(labels[stratified_sample(labels, 100)])
+
+
+def test_line_is_reduced_inside_block_only(ax):
+    x, y = np.arange(20000), np.random.default_rng(0).random(20000)
+    with reduced_plotting(500):
+        inside, = ax.plot(x, y)
+    outside, = ax.plot(x, y)
+    assert len(inside.get_xdata()) == 500
+    assert len(outside.get_xdata()) == 20000
+
+
+def test_other_threads_are_not_reduced(ax):
+    x, y = np.arange(20000), np.random.default_rng(0).random(20000)
+    drawn = []
+    with reduced_plotting(500):
+        thread = threading.Thread(target=lambda: drawn.append(len(ax.plot(x, y)[0].get_xdata())))
+        thread.start()
+        thread.join()
+    assert drawn == [20000]
+
+
+def test_nested_blocks_restore_outer_budget(ax):
+    x, y = np.arange(20000), np.random.default_rng(0).random(20000)
+    with reduced_plotting(500):
+        with reduced_plotting(100):
+            assert len(ax.plot(x, y)[0].get_xdata()) == 100
+        assert len(ax.plot(x, y)[0].get_xdata()) == 500
+
+
+def test_category_axis_keeps_original_labels(ax):
+    labels = np.array([f"2020-01-{1 + i % 28:02d}" for i in range(20000)], dtype=object)
+    with reduced_plotting(500):
+        line, = ax.plot(labels, np.random.default_rng(0).random(20000))
+    xdata = line.get_xdata()
+    assert len(xdata) <= 500 + 28
+    assert isinstance(xdata[0], str) and set(xdata) == set(labels)
+
+
+def test_histogram_is_prebinned(ax):
+    values = np.random.default_rng(0).normal(size=50000)
+    expected, _ = np.histogram(values, bins=20)
+    with reduced_plotting(500):
+        counts, _, _ = ax.hist(values, bins=20)
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_uniform_sample_is_sorted_and_deterministic():
+    idx = uniform_sample(100000, 1000)
+    assert len(idx) == 1000 and np.all(np.diff(idx) > 0)
+    np.testing.assert_array_equal(idx, uniform_sample(100000, 1000))
+    np.testing.assert_array_equal(uniform_sample(10, 1000), np.arange(10))
+
+
+def test_scatter_keeps_sizes_and_colours_aligned(ax):
+    x = np.arange(30000, dtype=float)
+    sizes = x / 100
+    colours = np.where(x < 29990, "common", "rare")
+    with reduced_plotting(1000):
+        points = ax.scatter(x, x * 2, s=sizes, c=(colours == "rare").astype(float))
+    offsets = points.get_offsets()
+    assert len(offsets) <= 1000
+    np.testing.assert_allclose(offsets[:, 1], offsets[:, 0] * 2)
+    np.testing.assert_allclose(points.get_sizes(), offsets[:, 0] / 100)
+    # Colour values have two strata, so the rare one survives the sample
+    assert (offsets[:, 0] >= 29990).any()
+
+
+def test_unsorted_numeric_line_is_left_alone(ax):
+    x = np.random.default_rng(0).random(20000)
+    with reduced_plotting(500):
+        line, = ax.plot(x, x)
+    assert len(line.get_xdata()) == 20000
@@ -0,0 +1,155 @@
+"""Coalescing, priorities, fairness and timeouts of the LLM scheduler."""
+import threading
+import time
+import pytest
+from app.llm_scheduler import BATCH, INTERACTIVE, LLMQueueTimeout, LLMScheduler, TokenBucket
+
+
+class _Response:
+    """Stand-in for a LangChain response without usage metadata."""
+
+    def __init__(self, content):
+        self.content = content
+        self.response_metadata = {}
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    # Give the thread time to reach the scheduler so queue order is deterministic
+    time.sleep(0.05)
+    return thread
+
+
+def _blocked_scheduler(**kwargs):
+    """A one-slot scheduler whose slot is held until the returned event is set."""
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, max_concurrency=1, **kwargs)
+    release = threading.Event()
+    holder = _start(scheduler.submit, "hold", lambda: release.wait(5) and _Response("held"), "hold")
+    return scheduler, release, holder
+
+
+def test_identical_prompts_are_coalesced():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, max_concurrency=4, queue_timeout=5)
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return _Response("shared")
+
+    threads = [
+        _start(lambda: results.append(scheduler.submit("insights", call, "same prompt").content))
+        for _ in range(5)
+    ]
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ["shared"] * 5
+
+
+def test_interactive_goes_before_batch_and_clients_take_turns():
+    scheduler, release, holder = _blocked_scheduler(queue_timeout=5)
+    order = []
+
+    def submit(prompt, priority, client):
+        scheduler.submit("c", lambda: order.append(prompt) or _Response(prompt), prompt, priority, client)
+
+    threads = [
+        _start(submit, "a1", BATCH, "a"),
+        _start(submit, "a2", BATCH, "a"),
+        _start(submit, "a3", BATCH, "a"),
+        _start(submit, "b1", BATCH, "b"),
+        _start(submit, "i1", INTERACTIVE, "c"),
+    ]
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join()
+    assert order == ["i1", "a1", "b1", "a2", "a3"]
+
+
+def test_coalesced_interactive_caller_promotes_waiting_batch_call():
+    scheduler, release, holder = _blocked_scheduler(queue_timeout=5)
+    order = []
+
+    def submit(prompt, priority, client):
+        scheduler.submit("c", lambda: order.append(prompt) or _Response(prompt), prompt, priority, client)
+
+    threads = [
+        _start(submit, "first", BATCH, "a"),
+        _start(submit, "second", BATCH, "b"),
+        _start(submit, "second", INTERACTIVE, "c"),
+    ]
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join()
+    assert order == ["second", "first"]
+
+
+def test_queue_timeout():
+    scheduler, release, holder = _blocked_scheduler(queue_timeout=0.2)
+    with pytest.raises(LLMQueueTimeout):
+        scheduler.submit("c", lambda: _Response("late"), "other prompt")
+    release.set()
+    holder.join()
+
+
+def test_coalesced_caller_times_out_on_stuck_call():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, max_concurrency=1, queue_timeout=0.2)
+    release = threading.Event()
+    leader = _start(scheduler.submit, "c", lambda: release.wait(5) and _Response("slow"), "prompt")
+    start = time.monotonic()
+    with pytest.raises(LLMQueueTimeout):
+        scheduler.submit("c", lambda: _Response("unused"), "prompt")
+    assert time.monotonic() - start < 1
+    release.set()
+    leader.join()
+
+
+def test_request_rate_limit_spaces_calls():
+    # 600/minute: a full bucket of 600, then one call per 0.1s
+    scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=0, max_concurrency=4, queue_timeout=5)
+    scheduler._requests.level = 0
+    start = time.monotonic()
+    for i in range(3):
+        scheduler.submit("c", lambda: _Response("ok"), f"prompt {i}")
+    assert time.monotonic() - start >= 0.25
+
+
+def test_failed_call_reaches_coalesced_callers_and_is_not_cached():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, max_concurrency=4, queue_timeout=5)
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise ValueError("upstream 500")
+
+    def submit():
+        try:
+            scheduler.submit("insights", failing, "same prompt")
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [_start(submit) for _ in range(3)]
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ["upstream 500"] * 3
+    # The flight is gone once it finished, so the next identical call runs again
+    assert scheduler.submit("insights", lambda: _Response("retried"), "same prompt").content == "retried"
+
+
+def test_token_bucket_refills_and_settles_actual_usage():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 per second
+    assert bucket.wait_time(600) == 0
+    bucket.take(600)
+    assert bucket.wait_time(10) == pytest.approx(1.0, abs=0.05)
+    # A call estimated at 100 tokens that used 40 gives 60 back
+    bucket.adjust(100 - 40)
+    assert bucket.wait_time(10) == 0
+    assert bucket.wait_time(10_000) == pytest.approx(54.0, abs=0.1)  # Capped at a full bucket
+    assert TokenBucket(0).wait_time(10_000) == 0
@@ -0,0 +1,36 @@
+"""Request timing headers and the Prometheus endpoint."""
+
+
+def _server_timing(response) -> dict:
+    spans = {}
+    for span in response.headers["server-timing"].split(", "):
+        name, duration = span.split(";dur=")
+        spans[name] = float(duration)
+    return spans
+
+
+def test_analyze_reports_pipeline_stages_in_server_timing(client, csv_bytes):
+    response = client.post("/analyze", files={"file": ("data.csv", csv_bytes, "text/csv")})
+    assert response.status_code == 200
+    spans = _server_timing(response)
+    # Stages timed on the analysis worker thread reach the request's header too
+    for name in ("upload", "profile", "insights", "charts", "summary", "serialize", "total"):
+        assert name in spans
+    assert spans["total"] >= spans["profile"] + spans["insights"]
+
+
+def test_every_response_carries_total_time(client):
+    assert list(_server_timing(client.get("/health/live"))) == ["total"]
+
+
+def test_metrics_exposes_requests_by_route_template(client, csv_bytes):
+    response = client.post("/analyze", files={"file": ("data.csv", csv_bytes, "text/csv")})
+    client.get(f"/reports/{response.json()['report_id']}.md")
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200 and metrics.headers["content-type"].startswith("text/plain")
+    text = metrics.text
+    assert 'route="/analyze"' in text and 'route="/reports/{report_id}.md"' in text
+    assert response.json()["report_id"] not in text
+    for name in ("csv_insight_stage_seconds", "csv_insight_charts_total", "csv_insight_requests_in_flight"):
+        assert name in text
@@ -0,0 +1,42 @@
+"""Admin-only request profiling."""
+import pstats
+import pytest
+from app import api, profiling
+
+TOKEN = "admin-secret"
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    # Both modules bind the token at import
+    monkeypatch.setattr(api, "PROFILING_ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILING_ADMIN_TOKEN", TOKEN)
+
+
+def test_profiles_are_404_without_a_configured_token(client):
+    assert client.get("/profiles/anything.json").status_code == 404
+    assert client.get("/profiles/anything.json", headers={"X-Profile-Token": "guess"}).status_code == 404
+
+
+def test_profiles_need_the_admin_token(client, admin_token):
+    assert client.get("/profiles/anything.json").status_code == 403
+    assert client.get("/profiles/anything.json", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    assert client.get("/profiles/anything.json?token=" + TOKEN).status_code == 403
+    assert client.get("/profiles/anything.json", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+
+def test_admin_request_is_profiled(client, csv_bytes, admin_token, tmp_path):
+    headers = {"X-Profile-Token": TOKEN}
+    plain = client.post("/analyze", files={"file": ("data.csv", csv_bytes, "text/csv")})
+    assert "x-profile-id" not in plain.headers
+
+    response = client.post("/analyze", files={"file": ("data.csv", csv_bytes, "text/csv")}, headers=headers)
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    summary = client.get(f"/profiles/{profile_id}.json", headers=headers).json()
+    assert summary["id"] == profile_id and summary["memory"] is True
+    pstats_path = tmp_path / "run.pstats"
+    pstats_path.write_bytes(client.get(f"/profiles/{profile_id}.pstats", headers=headers).content)
+    assert pstats.Stats(str(pstats_path)).total_calls > 0
+    assert client.get(f"/profiles/{profile_id}.pstats").status_code == 403
@@ -0,0 +1,95 @@
+"""Quality tier selection from queue depth and latency, and what each tier serves."""
+import time
+from contextlib import ExitStack
+import pytest
+from app import api
+from app.quality import TIERS, QualityPolicy, QualityTier
+from conftest import make_csv
+
+
+def _policy(**kwargs):
+    options = dict(enabled=True, queue_thresholds=[2, 3], latency_target_ms=100, latency_window=3, recovery_s=60)
+    options.update(kwargs)
+    return QualityPolicy(**options)
+
+
+def test_tiers_are_cumulative():
+    assert QualityTier(0).name == "full" and not QualityTier(0).sampled_profile
+    tier = QualityTier(3)
+    assert tier.sampled_profile and tier.skip_summary and tier.inline_html and not tier.profile_only
+    assert QualityTier(99).name == TIERS[-1]
+
+
+def test_depth_steps_tier_up():
+    policy = _policy()
+    with ExitStack() as stack:
+        tiers = [stack.enter_context(policy.admit()).name for _ in range(3)]
+    assert tiers == ["full", "sampled_profile", "low_dpi_charts"]
+    with policy.admit() as tier:
+        assert tier.name == "full"
+
+
+def test_disabled_policy_is_always_full():
+    policy = _policy(enabled=False)
+    with ExitStack() as stack:
+        assert {stack.enter_context(policy.admit()).name for _ in range(5)} == {"full"}
+
+
+def test_latency_window_steps_up_and_down():
+    policy = _policy()
+    for _ in range(3):
+        policy._observe(500)
+    assert policy._tier().name == "sampled_profile"
+    for _ in range(3):
+        policy._observe(500)
+    assert policy._tier().name == "low_dpi_charts"
+    # Within target but above the recovery fraction: hold the tier
+    for _ in range(3):
+        policy._observe(80)
+    assert policy._tier().name == "low_dpi_charts"
+    for _ in range(3):
+        policy._observe(10)
+    assert policy._tier().name == "sampled_profile"
+
+
+def test_latency_tier_recovers_while_idle():
+    policy = _policy(recovery_s=0.1)
+    for _ in range(6):
+        policy._observe(500)
+    assert policy._tier().level == 2
+    time.sleep(0.15)
+    assert policy._tier().level == 1
+    time.sleep(0.25)
+    assert policy._tier().level == 0
+
+
+def test_stale_latencies_leave_the_window():
+    policy = _policy(recovery_s=0.1)
+    policy._observe(500)
+    policy._observe(500)
+    time.sleep(0.15)
+    policy._observe(500)
+    assert policy._tier().level == 0
+
+
+def _analyze_at(client, fake_llm, monkeypatch, level: int, seed: int):
+    # One in-flight analysis reaches `level` thresholds of 1, so it runs at that tier
+    monkeypatch.setattr(api, "quality_policy", _policy(queue_thresholds=[1] * level))
+    before = fake_llm.stats["requests"]
+    response = client.post(
+        "/analyze?include_reports=true",
+        files={"file": ("data.csv", make_csv(seed=seed), "text/csv")},
+    )
+    assert response.status_code == 200
+    return response, fake_llm.stats["requests"] - before
+
+
+@pytest.mark.parametrize("level, llm_calls", [(0, 2), (3, 1), (5, 0)])
+def test_analyze_serves_the_admitted_tier(client, fake_llm, monkeypatch, level, llm_calls):
+    response, calls = _analyze_at(client, fake_llm, monkeypatch, level, seed=100 + level)
+    body = response.json()
+    assert response.headers["x-quality-tier"] == body["quality_tier"] == TIERS[level]
+    assert calls == llm_calls
+    assert (body["html_report"] is not None) == (level < 4)
+    assert (len(body["insights"]) == 0) == (level == 5)
+    assert body["summary"]
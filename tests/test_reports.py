@@ -0,0 +1,47 @@
+"""Stored reports: chart caching and HTML safety."""
+from app.api import REPORT_CSP
+from app.formatter import ReportRenderer
+from app.schemas import DatasetProfile, Insight
+from app.store import report_store
+
+
+def _analyze(client, csv_bytes) -> dict:
+    response = client.post("/analyze", files={"file": ("data.csv", csv_bytes, "text/csv")})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_chart_etag_revalidates_with_304(client, csv_bytes):
+    body = _analyze(client, csv_bytes)
+    chart_url = next(url for url in body["charts"] if url)
+    first = client.get(chart_url)
+    assert first.status_code == 200 and first.headers["content-type"] == "image/png"
+    etag = first.headers["etag"]
+    assert "immutable" in first.headers["cache-control"]
+
+    again = client.get(chart_url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert client.get(chart_url, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_missing_report_and_chart_are_404(client, csv_bytes):
+    body = _analyze(client, csv_bytes)
+    assert client.get("/reports/unknown.html").status_code == 404
+    assert client.get(f"/reports/{body['report_id']}/charts/99.png").status_code == 404
+
+
+def test_html_report_escapes_untrusted_text(client):
+    payload = "<script>alert(1)</script>"
+    profile = DatasetProfile(
+        n_rows=1, n_cols=1, columns=[payload], dtypes={payload: "numeric"},
+        null_counts={payload: 0}, unique_counts={payload: 1}, summary_stats={}, correlations={},
+    )
+    insight = Insight(title=payload, description=payload, rationale=payload, chart_code="")
+    report_id = report_store.add(ReportRenderer(profile, [insight], payload, [None]))
+
+    for embed in ("true", "false"):
+        response = client.get(f"/reports/{report_id}.html?embed={embed}")
+        assert response.status_code == 200
+        assert "<script>" not in response.text
+        assert "&lt;script&gt;alert(1)&lt;/script&gt;" in response.text
+        assert response.headers["content-security-policy"] == REPORT_CSP
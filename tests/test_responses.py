@@ -0,0 +1,64 @@
+"""JSON serialization and content-encoding negotiation."""
+import gzip
+import json
+import pytest
+from starlette.requests import Request
+from app import responses
+from app.responses import choose_encoding, encode_json, json_response, negotiated_response
+from app.schemas import Insight
+
+
+def _request(accept_encoding=None) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_encode_json_serializes_models_inside_dicts():
+    insight = Insight(title="t", description="d", rationale="r", chart_code="")
+    body = json.loads(encode_json({"insights": [insight], "n": 1}))
+    assert body["insights"][0]["title"] == "t" and body["n"] == 1
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", "br"),
+])
+def test_choose_encoding(header, expected):
+    if expected == "br" and responses.brotli is None:
+        pytest.skip("brotli not installed")
+    assert choose_encoding(header) == expected
+
+
+def test_gzip_response_round_trips():
+    payload = {"rows": list(range(2000))}
+    response = json_response(_request("gzip"), payload)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(response.body)) == payload
+
+
+def test_small_and_precompressed_bodies_are_sent_as_is():
+    assert "content-encoding" not in json_response(_request("gzip"), {"ok": True}).headers
+    png = negotiated_response(_request("gzip"), b"\x89PNG" * 1000, "image/png")
+    assert "content-encoding" not in png.headers
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "identity"])
+def test_analyze_response_is_negotiated(client, csv_bytes, encoding):
+    if encoding == "br" and responses.brotli is None:
+        pytest.skip("brotli not installed")
+    response = client.post(
+        "/analyze",
+        files={"file": ("data.csv", csv_bytes, "text/csv")},
+        headers={"Accept-Encoding": encoding},
+    )
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == (None if encoding == "identity" else encoding)
+    assert response.headers["vary"] == "Accept-Encoding"
+    # The client decodes the body, which is the same JSON whatever the coding
+    body = response.json()
+    assert body["report_id"] and len(body["insights"]) == 3
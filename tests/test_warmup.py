@@ -0,0 +1,55 @@
+"""Readiness reporting around the startup warm-up."""
+import threading
+import pytest
+from app import api, warmup
+
+
+@pytest.fixture
+def state(monkeypatch):
+    state = warmup.WarmUpState()
+    monkeypatch.setattr(warmup, "warm_up_state", state)
+    monkeypatch.setattr(api, "warm_up_state", state)
+    return state
+
+
+def test_ready_is_503_until_warm_up_finishes(client, state, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(warmup, "_prime_llm_client", lambda: release.wait(10))
+    monkeypatch.setattr(warmup, "_prime_chart_workers", lambda: None)
+
+    thread = warmup.start_warm_up()
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["warm_up"] == "running"
+    assert client.get("/health/live").status_code == 200
+
+    release.set()
+    thread.join(10)
+    response = client.get("/health/ready")
+    assert response.status_code == 200 and response.json()["warm_up"] == "done"
+    assert response.json()["warm_up_ms"] > 0
+
+
+def test_ready_does_not_wait_for_chart_workers(client, state, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(warmup, "_prime_chart_workers", lambda: release.wait(10))
+
+    thread = warmup.start_warm_up()
+    try:
+        assert state.done.wait(10)
+        assert client.get("/health/ready").status_code == 200
+        assert thread.is_alive()
+    finally:
+        release.set()
+        thread.join(10)
+
+
+def test_failed_warm_up_or_missing_key_is_not_ready(client, state, monkeypatch):
+    state.error = "boom"
+    state.done.set()
+    assert client.get("/health/ready").json()["warm_up"] == "failed: boom"
+    assert client.get("/health/ready").status_code == 503
+
+    state.error = None
+    monkeypatch.setattr(warmup, "GROQ_API_KEY", None)
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["groq_api_key"] == "missing"